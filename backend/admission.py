@@ -0,0 +1,161 @@
+import math
+import os
+import re
+import time
+
+from starlette.responses import JSONResponse
+
+from backend.auth import token_cache
+from backend.cache import MISS, TTLCache
+from backend.metrics import SHED, pool_metrics
+
+# name, method, path pattern, default "rate/burst" (requests per second / bucket size)
+ROUTE_BUDGETS = [
+    ("create_post", "POST", r"/api/posts", "0.5/10"),
+    ("bulk_import", "POST", r"/api/posts/bulk", "0.1/2"),
+    ("add_comment", "POST", r"/api/posts/[^/]+/comments", "1/20"),
+    ("react_to_post", "POST", r"/api/posts/[^/]+/reactions", "2/30"),
+    ("default", None, r"/api/.*", "50/100"),
+]
+
+# never throttled: probes and scrapes must still answer while we shed load
+EXEMPT_PATHS = {"/api/health", "/api/metrics", "/api/stats"}
+
+# opt-in: limits are per process and need tuning for the deployment
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "0") == "1"
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "256"))
+MAX_POOL_WAITERS = int(os.getenv("ADMISSION_MAX_POOL_WAITERS", "50"))
+MAX_POOL_WAIT_MS = float(os.getenv("ADMISSION_MAX_POOL_WAIT_MS", "250"))
+MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))
+# load balancers whose X-Forwarded-For we believe, e.g. "10.0.0.2,10.0.0.3"
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+
+def parse_budget(spec: str):
+    rate, _, burst = spec.partition("/")
+    return float(rate), float(burst or rate)
+
+
+def load_budgets():
+    """ROUTE_BUDGETS with ADMISSION_<NAME>=rate/burst overrides from the env."""
+    budgets = []
+    for name, method, pattern, default in ROUTE_BUDGETS:
+        rate, burst = parse_budget(os.getenv(f"ADMISSION_{name.upper()}", default))
+        budgets.append((name, method, re.compile(pattern + "$"), rate, burst))
+    return budgets
+
+
+def client_ip(scope) -> str:
+    client = scope.get("client")
+    ip = client[0] if client else "unknown"
+    if ip not in TRUSTED_PROXIES:
+        return ip
+    for name, value in scope.get("headers") or ():
+        if name == b"x-forwarded-for":
+            # rightmost address our own proxies didn't add
+            for hop in reversed([h.strip() for h in value.decode("latin-1").split(",")]):
+                if hop and hop not in TRUSTED_PROXIES:
+                    return hop
+    return ip
+
+
+def client_key(scope) -> str:
+    """The caller's user id when its bearer token is already known good, else its IP.
+
+    Unverified tokens never get a bucket of their own, or a flooder could
+    mint a fresh one per request by sending random tokens.
+    """
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme == "Bearer" and token:
+                user = token_cache.peek(token)
+                if user is not MISS:
+                    return "u:" + user["_id"]
+    return "ip:" + client_ip(scope)
+
+
+class AdmissionMiddleware:
+    """Token-bucket rate limits per client and route, plus load shedding.
+
+    Clients are told apart by user, once their token has been verified, or
+    else by IP (taken from X-Forwarded-For behind ADMISSION_TRUSTED_PROXIES).
+    Each matching budget refills at `rate` requests per second up to `burst`;
+    an empty bucket gets a 429 with Retry-After. Independently, new requests
+    get a 503 while too many are already in flight or the Mongo pool queue
+    is backing up, so overload fails fast instead of slowing everyone down.
+    """
+
+    in_flight = 0
+
+    def __init__(self, app, budgets=None):
+        self.app = app
+        self.budgets = budgets if budgets is not None else load_budgets()
+        # (budget, client) -> (tokens, last refill); a bucket idle long enough
+        # to refill completely expires, which is the same as a fresh one
+        self.buckets = TTLCache(maxsize=MAX_CLIENTS, ttl=60)
+
+    def budget_for(self, method: str, path: str):
+        for budget in self.budgets:
+            if (budget[1] is None or budget[1] == method) and budget[2].match(path):
+                return budget
+        return None
+
+    def take(self, budget, key: str) -> float:
+        """Spend one token; 0 if admitted, else seconds until one is available."""
+        name, _, _, rate, burst = budget
+        now = time.monotonic()
+        bucket = self.buckets.get((name, key))
+        if bucket is MISS:
+            tokens = burst
+        else:
+            tokens, last = bucket
+            tokens = min(burst, tokens + (now - last) * rate)
+
+        if tokens < 1:
+            self.buckets.set((name, key), (tokens, now), ttl=(burst - tokens) / rate)
+            return (1 - tokens) / rate
+        tokens -= 1
+        self.buckets.set((name, key), (tokens, now), ttl=(burst - tokens) / rate)
+        return 0.0
+
+    def overloaded(self):
+        if AdmissionMiddleware.in_flight >= MAX_CONCURRENCY:
+            return "concurrency"
+        if pool_metrics.waiting >= MAX_POOL_WAITERS:
+            return "pool_waiters"
+        # the average only moves on checkouts, so require a live queue too or
+        # shedding would keep it from ever coming back down
+        if pool_metrics.waiting and pool_metrics.avg_wait * 1000 >= MAX_POOL_WAIT_MS:
+            return "pool_wait"
+        return None
+
+    async def reject(self, scope, receive, send, status: int, reason: str, retry_after: float):
+        SHED.labels(reason).inc()
+        detail = "Too many requests" if status == 429 else "Server busy, try again shortly"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        reason = self.overloaded()
+        if reason:
+            return await self.reject(scope, receive, send, 503, reason, 1)
+
+        budget = self.budget_for(scope["method"], scope["path"])
+        if budget is not None:
+            wait = self.take(budget, client_key(scope))
+            if wait:
+                return await self.reject(scope, receive, send, 429, budget[0], wait)
+
+        AdmissionMiddleware.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            AdmissionMiddleware.in_flight -= 1
@@ -0,0 +1,239 @@
+import asyncio
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from backend.db import get_db
+from backend.indexes import plan_stages
+
+# opt-in: each explain re-runs the query, so keep this off in production
+# unless the sample rate is low
+AUDIT_ENABLED = os.getenv("QUERY_AUDIT", "0") == "1"
+AUDIT_SAMPLE = float(os.getenv("QUERY_AUDIT_SAMPLE", "0.05"))
+AUDIT_REEXPLAIN = float(os.getenv("QUERY_AUDIT_REEXPLAIN", "300"))
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# driver bookkeeping that explain rejects or doesn't need
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction", "cursor"}
+
+_scope = contextvars.ContextVar("audit_scope", default=None)
+
+
+def shape(value):
+    """The structure of a filter/pipeline with the literal values blanked out."""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [shape(value[0])] if value else []
+    return 1
+
+
+def query_shape(command_name: str, command: dict) -> str:
+    parts = {k: shape(v) for k, v in command.items() if k not in DRIVER_FIELDS}
+    if command_name in ("update", "delete"):
+        # the view buffer batches hundreds of identical statements
+        key = "updates" if command_name == "update" else "deletes"
+        parts[key] = shape(command.get(key, [])[:1])
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def explain_command(command_name: str, command: dict) -> dict:
+    cmd = {k: v for k, v in command.items() if k not in DRIVER_FIELDS}
+    if command_name == "aggregate":
+        cmd["cursor"] = {}
+    if command_name == "update":
+        cmd["updates"] = cmd["updates"][:1]
+    if command_name == "delete":
+        cmd["deletes"] = cmd["deletes"][:1]
+    return cmd
+
+
+def summarize_explain(result: dict) -> dict:
+    """Winning plan stages, docs/keys examined vs returned and how the sort ran."""
+    stages = []
+    pipeline = []
+    planner = result.get("queryPlanner")
+    stats = result.get("executionStats") or {}
+    # aggregate explains nest the find part under the first $cursor stage
+    for stage in result.get("stages") or ():
+        name = next(iter(stage))
+        if name == "$cursor":
+            planner = stage["$cursor"].get("queryPlanner")
+            stats = stage["$cursor"].get("executionStats") or {}
+        else:
+            pipeline.append(name)
+    if planner:
+        stages = plan_stages(planner.get("winningPlan") or {})
+
+    return {
+        "plan": stages,
+        "pipeline": pipeline,
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages or "$sort" in pipeline,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "ms": stats.get("executionTimeMillis"),
+    }
+
+
+class QueryAudit(monitoring.CommandListener):
+    """Samples the queries each route issues and explains them in the background.
+
+    The first time a route sends a query shape it is always explained; after
+    that it's re-explained with probability `sample` at most every
+    `reexplain` seconds. Results are kept per route and query shape.
+    """
+
+    def __init__(self, sample: float = AUDIT_SAMPLE, reexplain: float = AUDIT_REEXPLAIN):
+        self.sample = sample
+        self.reexplain = reexplain
+        self.entries = {}
+        # started() runs on the driver's threads, report() on the event loop
+        self._lock = threading.Lock()
+        self.explains = 0
+        self.failures = 0
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._registered = False
+
+    def started(self, event):
+        if self._loop is None or event.command_name not in EXPLAINABLE:
+            return
+        scope = _scope.get()
+        if scope is None:
+            return  # background work (view flushes, snapshots), not a request
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        route = f'{scope["method"]} {route}'
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        if event.command_name == "aggregate" and any(
+            "$out" in s or "$merge" in s for s in event.command.get("pipeline", ())
+        ):
+            return
+
+        key = (route, collection, query_shape(event.command_name, event.command))
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry["seen"] += 1
+                if now - entry["explained_at"] < self.reexplain or random.random() >= self.sample:
+                    return
+                entry["explained_at"] = now
+            else:
+                self.entries[key] = {"seen": 1, "explained_at": now, "result": None}
+
+        cmd = explain_command(event.command_name, event.command)
+        self._loop.call_soon_threadsafe(self._enqueue, key, event.database_name, cmd)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def _enqueue(self, key, database, cmd):
+        if self._queue.qsize() < 1000:
+            self._queue.put_nowait((key, database, cmd))
+
+    async def explain(self, key, database, cmd):
+        try:
+            result = await get_db().client[database].command("explain", cmd, verbosity="executionStats")
+        except PyMongoError as e:
+            self.failures += 1
+            self.entries[key]["error"] = str(e)
+            return
+        self.explains += 1
+        self.entries[key]["result"] = summarize_explain(result)
+
+    async def _run(self):
+        while True:
+            key, database, cmd = await self._queue.get()
+            token = _scope.set(None)  # the explain itself isn't audited
+            try:
+                await self.explain(key, database, cmd)
+            finally:
+                _scope.reset(token)
+                self._queue.task_done()
+
+    def start(self):
+        """Must run before the Mongo client is created, so it sees our events."""
+        if not self._registered:
+            monitoring.register(self)
+            self._registered = True
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        if self._task is None:
+            self._task = self._loop.create_task(self._run())
+
+    async def drain(self):
+        """Wait for every queued explain to finish."""
+        if self._queue is not None:
+            await asyncio.sleep(0)  # let call_soon_threadsafe enqueues land first
+            await self._queue.join()
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report(self) -> dict:
+        """{route: [query entries]}, scans and in-memory sorts first."""
+        with self._lock:
+            entries = [(key, dict(entry)) for key, entry in self.entries.items()]
+        routes = {}
+        for (route, collection, query), entry in entries:
+            routes.setdefault(route, []).append({
+                "collection": collection,
+                "query": json.loads(query),
+                "seen": entry["seen"],
+                "error": entry.get("error"),
+                **(entry["result"] or {}),
+            })
+        for items in routes.values():
+            items.sort(key=lambda e: (not e.get("collscan"), not e.get("in_memory_sort"), e["collection"]))
+        return routes
+
+    def problems(self, include_sorts: bool = False) -> list:
+        """[(route, collection, what)] for every scan (and in-memory sort, if asked)."""
+        found = []
+        for route, items in self.report().items():
+            for e in items:
+                if e.get("collscan"):
+                    found.append((route, e["collection"], "COLLSCAN"))
+                elif include_sorts and e.get("in_memory_sort"):
+                    found.append((route, e["collection"], "in-memory sort"))
+        return found
+
+
+query_audit = QueryAudit()
+
+
+class AuditMiddleware:
+    """Makes the request's scope (and so its matched route) visible to QueryAudit."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
@@ -1,7 +1,52 @@
+import os
 import secrets
 from datetime import datetime
-from fastapi import HTTPException, Header
+from fastapi import HTTPException, Header, Depends
 from backend.db import users_col
+from backend.cache import TTLCache, MISS
+from backend.invalidation import invalidation_bus
+
+# token -> user doc
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "60")),
+)
+# tokens the db rejected, kept apart so a flood of random ones can't evict real users
+rejected_tokens = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_NEGATIVE_SIZE", "1000")),
+    ttl=float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "10")),
+)
+
+# users allowed on admin-only operations, by email; nobody when unset
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+
+def invalidate_token(token: str):
+    token_cache.invalidate(token)
+    rejected_tokens.invalidate(token)
+
+
+def reset_tokens():
+    token_cache.clear()
+    rejected_tokens.clear()
+
+
+def invalidate_user(user_id: str):
+    """Drop every cached token that resolves to `user_id`."""
+    return token_cache.invalidate_where(lambda _, u: u["_id"] == str(user_id))
+
+
+def on_user_change(op, _id, change):
+    if op == "insert":
+        # another worker may have cached this token as invalid
+        token = (change.get("fullDocument") or {}).get("token")
+        if token:
+            invalidate_token(token)
+    else:
+        invalidate_user(_id)
+
+
+invalidation_bus.subscribe("users", on_user_change, reset=reset_tokens)
 
 async def create_user_token(username: str, email: str):
     existing = await users_col.find_one({"email": email})
@@ -23,6 +68,7 @@ async def create_user_token(username: str, email: str):
     }
 
     res = await users_col.insert_one(user)
+    invalidate_token(token)
 
     return {
         "id": str(res.inserted_id),
@@ -32,7 +78,7 @@ async def create_user_token(username: str, email: str):
     }
 
 
-async def require_user(authorization: str = Header(None)):
+async def bearer_token(authorization: str = Header(None)) -> str:
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
@@ -42,10 +88,31 @@ async def require_user(authorization: str = Header(None)):
             raise ValueError
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
+    return token
+
+
+async def require_user(token: str = Depends(bearer_token)):
+    user = token_cache.get(token)
+    if user is MISS:
+        if token in rejected_tokens:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        user = await users_col.find_one({"token": token})
+        if user:
+            user["_id"] = str(user["_id"])
+            token_cache.set(token, user)
+        else:
+            rejected_tokens.set(token, True)
 
-    user = await users_col.find_one({"token": token})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return dict(user)
+
+
+def is_admin(user) -> bool:
+    return (user.get("email") or "").lower() in ADMIN_EMAILS
+
 
-    user["_id"] = str(user["_id"])
+async def require_admin(user=Depends(require_user)):
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Admin only")
     return user
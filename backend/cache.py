@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+MISS = object()
+# handed to waiters when the request doing the load was cancelled
+RETRY = object()
+
+
+class TTLCache:
+    """Bounded LRU map whose entries also expire after `ttl` seconds.
+
+    `get` returns `MISS` for absent or expired keys, so `None` can be cached
+    as a negative result. When `max_bytes` is set, entries are also evicted
+    until the summed `sizeof(value)` fits.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int = None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.peek(key) is not MISS
+
+    def peek(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return MISS
+        return entry[1]
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return MISS
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        self._drop(key)
+        size = self.sizeof(value)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+        ):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    async def get_or_load(self, key, loader, cache_none: bool = False):
+        """Return the cached value or await `loader()` to fill it.
+
+        Concurrent misses on the same key share one in-flight load, and a
+        load that races with `invalidate` is returned but not stored. If the
+        caller doing the load is cancelled, the waiters start a new one.
+        """
+        value = self.get(key)
+        if value is not MISS:
+            return value
+
+        fut = self._loading.get(key)
+        if fut is not None:
+            value = await asyncio.shield(fut)
+            if value is RETRY:
+                return await self.get_or_load(key, loader, cache_none)
+            return value
+
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[key] = fut
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            if self._loading.get(key) is fut:
+                del self._loading[key]
+            fut.set_result(RETRY)
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # don't warn when no one else was waiting
+            raise
+        else:
+            fut.set_result(value)
+            if self._loading.get(key) is fut and (value is not None or cache_none):
+                self.set(key, value)
+            return value
+        finally:
+            if self._loading.get(key) is fut:
+                del self._loading[key]
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[2]
+        return True
+
+    def invalidate(self, key):
+        self._loading.pop(key, None)
+        if self._drop(key):
+            self.invalidations += 1
+            return True
+        return False
+
+    def invalidate_where(self, predicate):
+        stale = [k for k, (_, v, _) in self._data.items() if predicate(k, v)]
+        for k in stale:
+            self.invalidate(k)
+        return len(stale)
+
+    def clear(self):
+        self.invalidations += len(self._data)
+        self._data.clear()
+        self._loading.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
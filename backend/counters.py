@@ -0,0 +1,164 @@
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from bson.objectid import ObjectId
+
+from backend.db import posts_col, tag_counts_col, reactions_col, comments_col
+
+# tag_counts holds {_id: <tag>, count: <posts carrying it>}, kept in step with
+# posts by the write routes so top-tags never has to $unwind the corpus.
+# Posts likewise carry `reactions: {<type>: <count>}` mirroring reactions_col
+# and `comment_count` mirroring comments_col.
+
+DISTINCT_TAGS = {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}
+
+
+def tag_delta(old_tags=(), new_tags=()) -> Counter:
+    old, new = set(old_tags or ()), set(new_tags or ())
+    delta = Counter()
+    for tag in new - old:
+        delta[tag] += 1
+    for tag in old - new:
+        delta[tag] -= 1
+    return delta
+
+
+async def apply_tag_delta(delta: Counter):
+    delta = {tag: n for tag, n in delta.items() if n}
+    if not delta:
+        return
+    ops = [UpdateOne({"_id": tag}, {"$inc": {"count": n}}, upsert=True) for tag, n in delta.items()]
+    await tag_counts_col.bulk_write(ops, ordered=False)
+
+    dropped = [tag for tag, n in delta.items() if n < 0]
+    if dropped:
+        await tag_counts_col.delete_many({"_id": {"$in": dropped}, "count": {"$lte": 0}})
+
+
+async def top_tags(limit: int):
+    cursor = tag_counts_col.find({"count": {"$gt": 0}}).sort("count", -1).limit(limit)
+    return [{"tag": d["_id"], "count": d["count"]} async for d in cursor]
+
+
+def _tag_count_pipeline():
+    return [
+        {"$project": {"tags": DISTINCT_TAGS}},
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+    ]
+
+
+async def rebuild_tag_counts():
+    """Recompute tag_counts from scratch with one $out pass over posts."""
+    await posts_col.aggregate(_tag_count_pipeline() + [{"$out": tag_counts_col.name}]).to_list(length=None)
+    return await tag_counts_col.count_documents({})
+
+
+async def reconcile_tag_counts(dry_run: bool = False):
+    """Compare tag_counts with the posts collection and fix any drift.
+
+    Returns {tag: (stored, actual)} for every tag that was off.
+    """
+    actual = {}
+    async for d in posts_col.aggregate(_tag_count_pipeline(), allowDiskUse=True):
+        actual[d["_id"]] = d["count"]
+    stored = {}
+    async for d in tag_counts_col.find({}):
+        stored[d["_id"]] = d.get("count", 0)
+
+    drift = {}
+    for tag in set(actual) | set(stored):
+        if actual.get(tag, 0) != stored.get(tag, 0):
+            drift[tag] = (stored.get(tag, 0), actual.get(tag, 0))
+
+    if drift and not dry_run:
+        await apply_tag_delta(Counter({tag: now - was for tag, (was, now) in drift.items()}))
+    return drift
+
+
+def reaction_delta(old_type=None, new_type=None) -> dict:
+    """$inc document moving one user's reaction from `old_type` to `new_type`."""
+    if old_type == new_type:
+        return {}
+    inc = {}
+    if new_type:
+        inc[f"reactions.{new_type}"] = 1
+    if old_type:
+        inc[f"reactions.{old_type}"] = -1
+    return inc
+
+
+def reaction_totals(doc) -> list:
+    counts = (doc or {}).get("reactions") or {}
+    totals = [{"reaction": r, "count": n} for r, n in counts.items() if n > 0]
+    totals.sort(key=lambda t: t["count"], reverse=True)
+    return totals
+
+
+async def reconcile_reaction_counts(dry_run: bool = False):
+    """Recompute every post's `reactions` map from reactions_col.
+
+    Returns {post_id: (stored, actual)} for every post that was off.
+    """
+    actual = {}
+    pipeline = [{"$group": {"_id": {"post": "$post_id", "type": "$reaction_type"}, "count": {"$sum": 1}}}]
+    async for d in reactions_col.aggregate(pipeline, allowDiskUse=True):
+        post_id = str(d["_id"]["post"])
+        if ObjectId.is_valid(post_id):
+            actual.setdefault(post_id, {})[d["_id"]["type"]] = d["count"]
+
+    def nonzero(counts):
+        return {r: n for r, n in (counts or {}).items() if n}
+
+    drift = {}
+    seen = set()
+    async for d in posts_col.find({"reactions": {"$exists": True}}, {"reactions": 1}):
+        post_id = str(d["_id"])
+        seen.add(post_id)
+        stored = nonzero(d.get("reactions"))
+        if stored != actual.get(post_id, {}):
+            drift[post_id] = (stored, actual.get(post_id, {}))
+    for post_id, counts in actual.items():
+        if post_id not in seen:
+            drift[post_id] = ({}, counts)
+
+    if drift and not dry_run:
+        ops = [
+            UpdateOne({"_id": ObjectId(post_id)}, {"$set": {"reactions": counts}})
+            for post_id, (_, counts) in drift.items()
+        ]
+        await posts_col.bulk_write(ops, ordered=False)
+    return drift
+
+
+async def reconcile_comment_counts(dry_run: bool = False):
+    """Recompute every post's `comment_count` from comments_col.
+
+    Returns {post_id: (stored, actual)} for every post that was off.
+    """
+    actual = {}
+    pipeline = [{"$group": {"_id": "$post_id", "count": {"$sum": 1}}}]
+    async for d in comments_col.aggregate(pipeline, allowDiskUse=True):
+        post_id = str(d["_id"])
+        if ObjectId.is_valid(post_id):
+            actual[post_id] = d["count"]
+
+    drift = {}
+    seen = set()
+    async for d in posts_col.find({"comment_count": {"$exists": True}}, {"comment_count": 1}):
+        post_id = str(d["_id"])
+        seen.add(post_id)
+        if d.get("comment_count", 0) != actual.get(post_id, 0):
+            drift[post_id] = (d.get("comment_count", 0), actual.get(post_id, 0))
+    for post_id, n in actual.items():
+        if post_id not in seen:
+            drift[post_id] = (0, n)
+
+    if drift and not dry_run:
+        ops = [
+            UpdateOne({"_id": ObjectId(post_id)}, {"$set": {"comment_count": n}})
+            for post_id, (_, n) in drift.items()
+        ]
+        await posts_col.bulk_write(ops, ordered=False)
+    return drift
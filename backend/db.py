@@ -1,61 +1,112 @@
+import importlib
 import os
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from backend.metrics import mongo_metrics, pool_metrics
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("MONGO_DB", "cosmic_blog")
 
-client = AsyncIOMotorClient(
-    MONGO_URI,
-    tls=True,
-    tlsAllowInvalidCertificates=True
-)
+# MONGO_TLS=0 for a plain local mongod (benchmarks, development)
+MONGO_TLS = os.getenv("MONGO_TLS", "1") == "1"
+
+
+def _int_env(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _compressors(requested: str) -> list:
+    """Compressors from MONGO_COMPRESSORS whose client library is installed.
+
+    The server picks the first one it also supports.
+    """
+    modules = {"snappy": "snappy", "zstd": "zstandard", "zlib": "zlib"}
+    available = []
+    for name in (c.strip() for c in requested.split(",")):
+        if name not in modules:
+            continue
+        try:
+            importlib.import_module(modules[name])
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def client_options() -> dict:
+    options = {
+        "tls": MONGO_TLS,
+        "tlsAllowInvalidCertificates": MONGO_TLS,
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS"),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS"),
+        "event_listeners": [mongo_metrics, pool_metrics],
+    }
+    compressors = _compressors(os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return {k: v for k, v in options.items() if v is not None}
+
+
+_client = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    """The shared client, created on first use rather than at import."""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_URI, **client_options())
+    return _client
 
-db = client[DB_NAME]
 
-posts_col = db["posts"]
-users_col = db["users"]
-comments_col = db["comments"]
-tags_col = db["tags"]
-reactions_col = db["reactions"]
+def bind_client(client):
+    """Use an already-built client (benchmarks, stand-ins) instead of MONGO_URI."""
+    global _client
+    _client = client
 
 
-async def create_indexes():
-    existing = await posts_col.index_information()
-    existing_names = set(existing.keys())
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
 
-    if "tags_created_idx" not in existing_names:
-        await posts_col.create_index([("tags", 1), ("created_at", -1)], name="tags_created_idx")
 
-    if "author_idx" not in existing_names:
-        await posts_col.create_index("author_id", name="author_idx")
+def get_db():
+    return get_client()[DB_NAME]
 
-    if "content_text_idx" not in existing_names:
-        await posts_col.create_index([("content", "text")], name="content_text_idx")
 
-    existing_u = await users_col.index_information()
-    if "token_idx" not in existing_u:
-        await users_col.create_index("token", unique=True, sparse=True, name="token_idx")
+class LazyCollection:
+    """Module-level handle that resolves against the current client on use."""
 
-    existing_c = await comments_col.index_information()
-    if "comment_post_idx" not in existing_c:
-        await comments_col.create_index("post_id", name="comment_post_idx")
+    def __init__(self, name: str):
+        self.name = name
 
-    if "comment_post_created_idx" not in existing_c:
-        await comments_col.create_index([("post_id", 1), ("created_at", -1)], name="comment_post_created_idx")
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
 
-    reactions = db["reactions"]
-    existing_r = await reactions.index_information()
-    if "react_post_type_idx" not in existing_r:
-        await reactions.create_index([("post_id", 1), ("reaction_type", 1)], name="react_post_type_idx")
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
 
-    if "react_user_post_unique" not in existing_r:
-        await reactions.create_index([("user_id", 1), ("post_id", 1)], unique=True, name="react_user_post_unique")
 
+posts_col = LazyCollection("posts")
+users_col = LazyCollection("users")
+comments_col = LazyCollection("comments")
+tags_col = LazyCollection("tags")
+reactions_col = LazyCollection("reactions")
+tag_counts_col = LazyCollection("tag_counts")
+meta_col = LazyCollection("_meta")
+related_col = LazyCollection("related")
 
 
 async def ping_db():
-    await client.admin.command("ping")
+    await get_client().admin.command("ping")
     return True
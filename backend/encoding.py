@@ -0,0 +1,32 @@
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is the fallback
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, ObjectId):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """JSON-encode straight to bytes, the same way FastAPI would render it.
+
+    Uses orjson when it is installed; its datetime output matches isoformat()
+    for the naive UTC datetimes Motor returns.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return stdlib_dumps(obj)
+
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
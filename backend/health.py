@@ -0,0 +1,53 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from backend.db import ping_db
+
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", "5"))
+
+
+class HealthMonitor:
+    """Pings Mongo on a timer so health probes never touch the database."""
+
+    def __init__(self, interval: float = HEALTH_INTERVAL):
+        self.interval = interval
+        self.status = {"ok": False, "error": "starting", "checked_at": None, "latency_ms": None}
+        self._task = None
+
+    async def check(self):
+        started = time.perf_counter()
+        try:
+            await ping_db()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+        self.status = {
+            "ok": ok,
+            "error": error,
+            "checked_at": datetime.utcnow(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        return self.status
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+health_monitor = HealthMonitor()
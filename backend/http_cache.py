@@ -0,0 +1,89 @@
+import hashlib
+import os
+import zlib
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Response
+
+# Cache-Control per kind of route. The defaults make browsers and the CDN
+# revalidate every time, which is cheap now that unchanged payloads get a 304.
+CACHE_CONTROL = {
+    "post": os.getenv("CACHE_CONTROL_POST", "public, no-cache"),
+    "feed": os.getenv("CACHE_CONTROL_FEED", "public, no-cache"),
+    "search": os.getenv("CACHE_CONTROL_SEARCH", "public, no-cache"),
+    "private": os.getenv("CACHE_CONTROL_PRIVATE", "private, no-cache"),
+}
+
+# the fields post_etag reads; enough to revalidate without loading the body
+VALIDATOR_PROJECTION = {"created_at": 1, "updated_at": 1, "views": 1, "reactions": 1, "comment_count": 1}
+
+
+def post_version(doc):
+    return doc.get("updated_at") or doc.get("created_at")
+
+
+def _reactions_tag(reactions) -> str:
+    items = sorted((reactions or {}).items())
+    return format(zlib.crc32(repr(items).encode()), "x")
+
+
+def post_etag(doc) -> str:
+    """Strong ETag for one post: its version plus the counters shown with it.
+
+    The part before the first `~` is the version `If-Match` understands, so
+    the ETag can be sent back as-is when editing.
+    """
+    version = post_version(doc)
+    stamp = version.isoformat(timespec="milliseconds") if version else ""
+    counters = f'{doc.get("views", 0)}~{doc.get("comment_count", 0)}~{_reactions_tag(doc.get("reactions"))}'
+    return f'"{stamp}~{counters}"'
+
+
+def last_modified(doc) -> Optional[str]:
+    version = post_version(doc)
+    if version is None:
+        return None
+    return format_datetime(version.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def feed_etag(docs, *extra) -> str:
+    """Weak ETag over a page: ids, versions and counters of every item, in order."""
+    h = hashlib.blake2b(digest_size=12)
+    for d in docs:
+        version = post_version(d)
+        h.update(
+            f"{d.get('_id', d.get('id'))}|{version.isoformat() if version else ''}|"
+            f"{d.get('views', 0)}|{d.get('comment_count', 0)}|{_reactions_tag(d.get('reactions'))};".encode()
+        )
+    for part in extra:
+        h.update(f"{part};".encode())
+    return f'W/"{h.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def validator_headers(etag: str, policy: str, modified: Optional[str] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[policy]}
+    if modified:
+        headers["Last-Modified"] = modified
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,218 @@
+"""Every index the app relies on, declared in one place.
+
+`plan()` diffs MANIFEST against the live database, `apply()` creates what is
+missing, and `report()` lists indexes nobody uses plus hot query shapes the
+planner would answer with a collection scan. All three work on the
+collections concurrently. Also available as `python -m backend.manage indexes`.
+"""
+import asyncio
+
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+
+from backend.db import get_db
+
+# collection -> [(name, keys, options)]
+MANIFEST = {
+    "posts": [
+        # keyset pagination sorts on (created_at, _id); the _id tiebreak has to be
+        # in the index too or every page falls back to an in-memory sort
+        ("feed_idx", [("created_at", -1), ("_id", -1)], {}),
+        # these two also serve plain tag / author lookups through their prefix
+        ("tags_feed_idx", [("tags", 1), ("created_at", -1), ("_id", -1)], {}),
+        ("author_feed_idx", [("author_id", 1), ("created_at", -1), ("_id", -1)], {}),
+        ("content_text_idx", [("content", "text")], {}),
+        ("trend_idx", [("trend_score", -1), ("_id", -1)], {}),
+        ("tags_trend_idx", [("tags", 1), ("trend_score", -1), ("_id", -1)], {}),
+    ],
+    "tag_counts": [
+        ("tag_count_idx", [("count", -1)], {}),
+    ],
+    "users": [
+        ("token_idx", [("token", 1)], {"unique": True, "sparse": True}),
+        # register looks users up by email
+        ("email_idx", [("email", 1)], {}),
+    ],
+    "comments": [
+        # comment pages use the same (created_at, _id) keyset as the feeds;
+        # post_id-only lookups use its prefix
+        ("comment_post_feed_idx", [("post_id", 1), ("created_at", -1), ("_id", -1)], {}),
+    ],
+    "reactions": [
+        # per-post totals live on the post, so only the per-user lookup needs an index
+        ("react_user_post_unique", [("user_id", 1), ("post_id", 1)], {"unique": True}),
+    ],
+}
+
+# representative filters/sorts of the hot read paths, checked by report()
+HOT_QUERIES = [
+    ("feed", "posts", {}, [("created_at", -1), ("_id", -1)]),
+    ("tag_feed", "posts", {"tags": "x"}, [("created_at", -1), ("_id", -1)]),
+    ("related_candidates", "posts", {"tags": "x", "_id": {"$ne": "x"}}, [("created_at", -1), ("_id", -1)]),
+    ("author_feed", "posts", {"author_id": "x"}, [("created_at", -1), ("_id", -1)]),
+    ("trending", "posts", {"trend_score": {"$gt": 0}}, [("trend_score", -1), ("_id", -1)]),
+    ("tag_trending", "posts", {"tags": "x", "trend_score": {"$gt": 0}}, [("trend_score", -1), ("_id", -1)]),
+    ("top_tags", "tag_counts", {"count": {"$gt": 0}}, [("count", -1)]),
+    ("token_lookup", "users", {"token": "x"}, None),
+    ("register", "users", {"email": "x"}, None),
+    ("comments_page", "comments", {"post_id": "x"}, [("created_at", -1), ("_id", -1)]),
+    ("user_reaction", "reactions", {"post_id": "x", "user_id": "x"}, None),
+]
+
+# options that change what an index does; anything else (v, ns, ...) is ignored
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def normalize_keys(keys) -> tuple:
+    """Key pattern as index_information() reports it (text indexes become _fts/_ftsx)."""
+    out, text = [], False
+    for field, direction in keys:
+        if direction == "text":
+            if not text:
+                out += [("_fts", "text"), ("_ftsx", 1)]
+                text = True
+        else:
+            out.append((field, int(direction) if isinstance(direction, (int, float)) else direction))
+    return tuple(out)
+
+
+def spec_options(options: dict) -> dict:
+    return {k: options[k] for k in COMPARED_OPTIONS if options.get(k) not in (None, False)}
+
+
+async def plan_collection(name: str, wanted):
+    """{create, changed, exists_as, extra} for one collection."""
+    existing = await get_db()[name].index_information()
+    by_keys = {normalize_keys(info["key"]): idx for idx, info in existing.items()}
+
+    plan = {"create": [], "changed": [], "exists_as": [], "extra": []}
+    for idx, keys, options in wanted:
+        info = existing.get(idx)
+        if info is None:
+            other = by_keys.get(normalize_keys(keys))
+            if other is not None:
+                # same keys under another name; creating it again would fail
+                plan["exists_as"].append((idx, other))
+            else:
+                plan["create"].append((idx, keys, options))
+        elif normalize_keys(info["key"]) != normalize_keys(keys) or spec_options(info) != spec_options(options):
+            plan["changed"].append((idx, keys, options))
+
+    declared = {idx for idx, _, _ in wanted} | {other for _, other in plan["exists_as"]}
+    plan["extra"] = sorted(idx for idx in existing if idx != "_id_" and idx not in declared)
+    return plan
+
+
+async def plan(manifest=MANIFEST):
+    names = list(manifest)
+    plans = await asyncio.gather(*(plan_collection(n, manifest[n]) for n in names))
+    return dict(zip(names, plans))
+
+
+async def apply_collection(name: str, coll_plan: dict, rebuild_changed: bool = False, drop_extra: bool = False):
+    """Carry out one collection's plan; returns {index: error} for what failed."""
+    coll = get_db()[name]
+    errors = {}
+
+    for idx in coll_plan["extra"] if drop_extra else ():
+        try:
+            await coll.drop_index(idx)
+        except PyMongoError as e:
+            errors[idx] = str(e)
+
+    todo = list(coll_plan["create"])
+    if rebuild_changed:
+        for idx, keys, options in coll_plan["changed"]:
+            try:
+                await coll.drop_index(idx)
+                todo.append((idx, keys, options))
+            except PyMongoError as e:
+                errors[idx] = str(e)
+
+    if todo:
+        models = [IndexModel(keys, name=idx, **options) for idx, keys, options in todo]
+        try:
+            # one createIndexes command builds them all in a single pass
+            await coll.create_indexes(models)
+        except PyMongoError:
+            # retry one by one so a single bad index doesn't block the rest
+            for model in models:
+                try:
+                    await coll.create_indexes([model])
+                except PyMongoError as e:
+                    errors[model.document["name"]] = str(e)
+    return errors
+
+
+async def apply(manifest=MANIFEST, rebuild_changed: bool = False, drop_extra: bool = False):
+    """Bring the database in line with the manifest; returns (plan, {collection: {index: error}})."""
+    plans = await plan(manifest)
+    results = await asyncio.gather(*(
+        apply_collection(name, plans[name], rebuild_changed, drop_extra) for name in plans
+    ))
+    return plans, {name: errors for name, errors in zip(plans, results) if errors}
+
+
+async def create_indexes():
+    """Startup entry point: apply the manifest and say what it did or couldn't do."""
+    plans, errors = await apply()
+    created = sum(len(p["create"]) for p in plans.values()) - sum(len(e) for e in errors.values())
+    print(f"Indexes: {created} created")
+    for name, p in plans.items():
+        for idx, _, _ in p["changed"]:
+            print(f"Warning: index {name}.{idx} differs from the manifest (run `manage indexes apply --rebuild-changed`)")
+        for idx, other in p["exists_as"]:
+            print(f"Warning: index {name}.{idx} exists under the name {other!r}")
+    for name, failed in errors.items():
+        for idx, error in failed.items():
+            print(f"Warning: failed to create index {name}.{idx}: {error}")
+    return plans, errors
+
+
+def plan_stages(plan: dict) -> list:
+    """Every stage name in an explain() plan tree, root first."""
+    stages = []
+    todo = [plan]
+    while todo:
+        node = todo.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                todo.append(node[key])
+        todo.extend(node.get("inputStages") or ())
+    return stages
+
+
+async def explain_find(collection: str, query: dict, sort=None, limit: int = 20) -> dict:
+    cmd = {"find": collection, "filter": query, "limit": limit}
+    if sort:
+        cmd["sort"] = dict(sort)
+    return await get_db().command("explain", cmd, verbosity="queryPlanner")
+
+
+async def index_usage(name: str):
+    """[(index, ops, since)] from $indexStats, least used first."""
+    cursor = get_db()[name].aggregate([{"$indexStats": {}}])
+    usage = [(s["name"], s["accesses"]["ops"], s["accesses"]["since"]) async for s in cursor]
+    return sorted(usage, key=lambda u: u[1])
+
+
+async def report(manifest=MANIFEST, queries=HOT_QUERIES):
+    """{"unused": {collection: [(index, since)]}, "collscans": [query names]}."""
+    names = list(manifest)
+    usages = await asyncio.gather(*(index_usage(n) for n in names))
+    unused = {}
+    for name, usage in zip(names, usages):
+        idle = [(idx, since) for idx, ops, since in usage if ops == 0 and idx != "_id_"]
+        if idle:
+            unused[name] = idle
+
+    explains = await asyncio.gather(*(explain_find(c, q, s) for _, c, q, s in queries))
+    collscans = [
+        query[0] for query, ex in zip(queries, explains)
+        if "COLLSCAN" in plan_stages(ex["queryPlanner"]["winningPlan"])
+    ]
+    return {"unused": unused, "collscans": collscans}
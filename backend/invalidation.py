@@ -0,0 +1,228 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from backend.cache import MISS, TTLCache
+from backend.db import get_db, meta_col
+
+# auto: change streams when the server supports them, polling otherwise
+INVALIDATION_MODE = os.getenv("INVALIDATION_MODE", "auto")
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "5"))
+TOKEN_SAVE_INTERVAL = float(os.getenv("INVALIDATION_TOKEN_SAVE_INTERVAL", "5"))
+RESUME_TOKEN_ID = "invalidation_resume_token:" + os.getenv("INVALIDATION_CONSUMER", "api")
+# ask for pre-images (MongoDB 6.0+, collMod changeStreamPreAndPostImages) so
+# deletes and tag edits say which feeds they touched
+PRE_IMAGES = os.getenv("INVALIDATION_PRE_IMAGES", "0") == "1"
+
+# standalone mongod / no oplog; mongomock raises NotImplementedError instead
+NO_CHANGE_STREAMS = {40573, 40324, 20}
+# the saved token fell off the oplog
+HISTORY_LOST = {280, 286}
+
+# written by the view buffer on every flush; not worth evicting anything for
+VIEW_ONLY = {"views", "trend_score", "trend_epoch"}
+
+
+def changed_fields(change) -> set:
+    desc = change.get("updateDescription") or {}
+    return set(desc.get("updatedFields") or ()) | set(desc.get("removedFields") or ())
+
+
+class InvalidationBus:
+    """Fans out writes made by any worker to the in-process caches of this one.
+
+    Caches `subscribe(collection, handler, reset)`. `handler(op, _id, change)`
+    runs for each insert/update/replace/delete on the collection; `reset()`
+    runs whenever events may have been missed (reconnects, a lost resume
+    token) and, in polling mode, every `poll_interval` seconds, which turns
+    every subscribed cache into a short-TTL one.
+
+    A worker that already updated its own caches for a write calls
+    `expect(collection, _id)` before making it, and the next event for that
+    document is skipped. If someone else's write to the same document lands
+    first, theirs is skipped instead and ours is handled, which leaves the
+    caches just as fresh.
+    """
+
+    def __init__(self, mode: str = INVALIDATION_MODE, poll_interval: float = INVALIDATION_POLL_INTERVAL):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.active_mode = None
+        self._handlers = defaultdict(list)
+        self._resets = []
+        self._task = None
+        self._token = None
+        self._saved_at = 0.0
+        # (collection, _id) -> events still to skip
+        self._expected = TTLCache(maxsize=100000, ttl=60)
+        self.events = 0
+        self.skipped = 0
+        self.echoes = 0
+        self.resets = 0
+        self.errors = 0
+
+    def subscribe(self, collection: str, handler=None, reset=None):
+        if handler is not None:
+            self._handlers[collection].append(handler)
+        else:
+            self._handlers.setdefault(collection, [])
+        if reset is not None and reset not in self._resets:
+            self._resets.append(reset)
+
+    def expect(self, collection: str, _id):
+        """This worker is about to write `_id` and will handle it itself."""
+        if self.active_mode != "changestream":
+            return  # no events coming back to skip
+        key = (collection, _id)
+        n = self._expected.peek(key)
+        self._expected.set(key, (0 if n is MISS else n) + 1)
+
+    def unexpect(self, collection: str, _id):
+        """The write announced with `expect` didn't happen."""
+        key = (collection, _id)
+        n = self._expected.peek(key)
+        if n is MISS:
+            return
+        if n > 1:
+            self._expected.set(key, n - 1)
+        else:
+            self._expected.invalidate(key)
+
+    def dispatch(self, change):
+        collection = change["ns"]["coll"]
+        op = change["operationType"]
+        if op == "update" and changed_fields(change) <= VIEW_ONLY:
+            self.skipped += 1
+            return
+        _id = change["documentKey"]["_id"]
+        if (collection, _id) in self._expected:
+            self.unexpect(collection, _id)
+            self.echoes += 1
+            return
+        self.events += 1
+        for handler in self._handlers.get(collection, ()):
+            try:
+                handler(op, _id, change)
+            except Exception as e:
+                print("Warning: invalidation handler failed:", collection, e)
+
+    def reset_all(self):
+        self.resets += 1
+        self._expected.clear()
+        for reset in self._resets:
+            reset()
+
+    def pipeline(self):
+        return [
+            {"$match": {
+                "ns.coll": {"$in": sorted(self._handlers)},
+                "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+            }},
+            # only what handlers read; inserts would otherwise ship the whole document
+            {"$project": {
+                "ns": 1,
+                "operationType": 1,
+                "documentKey": 1,
+                "updateDescription": 1,
+                "fullDocument.token": 1,
+                "fullDocument.tags": 1,
+                "fullDocumentBeforeChange.tags": 1,
+            }},
+        ]
+
+    async def load_token(self):
+        doc = await meta_col.find_one({"_id": RESUME_TOKEN_ID})
+        return doc.get("token") if doc else None
+
+    async def save_token(self, force: bool = False):
+        if self._token is None or (not force and time.monotonic() - self._saved_at < TOKEN_SAVE_INTERVAL):
+            return
+        self._saved_at = time.monotonic()
+        await meta_col.update_one(
+            {"_id": RESUME_TOKEN_ID},
+            {"$set": {"token": self._token, "saved_at": time.time()}},
+            upsert=True,
+        )
+
+    async def watch(self):
+        token = self._token or await self.load_token()
+        options = {"full_document": "updateLookup"}
+        if PRE_IMAGES:
+            options["full_document_before_change"] = "whenAvailable"
+        async with get_db().watch(self.pipeline(), resume_after=token, **options) as stream:
+            self.active_mode = "changestream"
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    self.dispatch(change)
+                self._token = stream.resume_token
+                await self.save_token()
+
+    async def poll(self):
+        self.active_mode = "poll"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.reset_all()
+
+    async def _run(self):
+        if self.mode == "poll":
+            return await self.poll()
+        while True:
+            try:
+                await self.watch()
+            except NotImplementedError:
+                break
+            except OperationFailure as e:
+                if e.code in NO_CHANGE_STREAMS:
+                    break
+                if e.code in HISTORY_LOST:
+                    print("Warning: invalidation resume token expired, starting from now")
+                    self._token = None
+                    await meta_col.delete_one({"_id": RESUME_TOKEN_ID})
+                else:
+                    print("Warning: invalidation change stream failed:", e)
+                    self.errors += 1
+            except PyMongoError as e:
+                print("Warning: invalidation change stream failed:", e)
+                self.errors += 1
+            # anything could have changed while we weren't listening
+            self.active_mode = None
+            self.reset_all()
+            await asyncio.sleep(1)
+
+        print("Change streams unavailable, invalidating caches every", self.poll_interval, "s")
+        await self.poll()
+
+    def start(self):
+        if self.mode != "off" and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.save_token(force=True)
+        except PyMongoError as e:
+            print("Warning: could not save invalidation resume token:", e)
+
+    def stats(self):
+        return {
+            "mode": self.active_mode or "off",
+            "collections": sorted(self._handlers),
+            "events": self.events,
+            "skipped": self.skipped,
+            "echoes": self.echoes,
+            "resets": self.resets,
+            "errors": self.errors,
+        }
+
+
+invalidation_bus = InvalidationBus()
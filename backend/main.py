@@ -1,37 +1,109 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.routes import posts
-from backend.auth import create_user_token
-from backend.db import create_indexes, ping_db
+from backend.routes import bulk, posts
+from backend.routes.posts import feed_snapshots, post_cache, search_cache
+from backend.auth import create_user_token, rejected_tokens, require_admin, token_cache
+from backend.db import get_client, close_client
+from backend.indexes import create_indexes
+from backend.health import health_monitor
+from backend.related import related_index
+from backend.trending import trending
+from backend.invalidation import invalidation_bus
+from backend.views import view_buffer
+from backend.admission import ADMISSION_ENABLED, AdmissionMiddleware
+from backend.audit import AUDIT_ENABLED, AuditMiddleware, query_audit
+from backend.metrics import MetricsMiddleware, pool_metrics, render as render_metrics
 
 app = FastAPI(title="Cosmic Blog API")
 
+# innermost, so rejections still get CORS headers and show up in metrics
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+app.add_middleware(MetricsMiddleware)
+if AUDIT_ENABLED:
+    app.add_middleware(AuditMiddleware)
 
+# bulk declares fixed paths like /posts/export, so it goes before /posts/{post_id}
+app.include_router(bulk, prefix="/api")
 app.include_router(posts, prefix="/api")
 
 
 @app.get("/api/health")
 async def health():
-    await ping_db()
-    return {"ok": True}
+    status = health_monitor.status
+    return JSONResponse(jsonable_encoder(status), status_code=200 if status["ok"] else 503)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/stats")
+async def stats():
+    return {
+        "views": view_buffer.stats(),
+        "tokens": token_cache.stats(),
+        "rejected_tokens": rejected_tokens.stats(),
+        "posts": post_cache.stats(),
+        "search": search_cache.stats(),
+        "snapshots": feed_snapshots.stats(),
+        "invalidation": invalidation_bus.stats(),
+        "trending": trending.stats(),
+        "related": related_index.stats(),
+        "pool": {"waiting": pool_metrics.waiting, "last_wait_ms": round(pool_metrics.last_wait * 1000, 3)},
+    }
+
+
+@app.get("/api/admin/query-audit")
+async def query_audit_report(user=Depends(require_admin)):
+    if not AUDIT_ENABLED:
+        raise HTTPException(status_code=404, detail="Query audit is off (set QUERY_AUDIT=1)")
+    await query_audit.drain()
+    return {
+        "explains": query_audit.explains,
+        "failures": query_audit.failures,
+        "problems": query_audit.problems(include_sorts=True),
+        "routes": query_audit.report(),
+    }
 
 
 @app.on_event("startup")
 async def on_startup():
+    if AUDIT_ENABLED:
+        query_audit.start()
+    get_client()
+    health_monitor.start()
+    view_buffer.start()
+    feed_snapshots.start()
+    invalidation_bus.start()
+    trending.start()
     try:
         await create_indexes()
-        print("Indexes created")
     except Exception as e:
-        import traceback
-        print("Warning: failed to create indexes")
-        traceback.print_exc()
+        print("Warning: could not check indexes:", e)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await query_audit.stop()
+    await invalidation_bus.stop()
+    await trending.stop()
+    await feed_snapshots.stop()
+    await view_buffer.stop()
+    await health_monitor.stop()
+    close_client()
 
 
 @app.post("/api/register")
@@ -0,0 +1,144 @@
+"""Maintenance commands that run against the configured database.
+
+    python -m backend.manage rebuild-tag-counts
+    python -m backend.manage reconcile-tag-counts [--dry-run]
+    python -m backend.manage reconcile-reaction-counts [--dry-run]
+    python -m backend.manage reconcile-comment-counts [--dry-run]
+    python -m backend.manage backfill-summaries [--all]
+    python -m backend.manage backfill-trending
+    python -m backend.manage renormalize-trending
+    python -m backend.manage rebuild-related
+    python -m backend.manage indexes plan|apply|report [--rebuild-changed] [--drop-extra]
+"""
+import argparse
+import asyncio
+
+from backend import counters, indexes, summary
+from backend.related import related_index
+from backend.trending import trending
+
+
+async def rebuild_tag_counts(args):
+    n = await counters.rebuild_tag_counts()
+    print(f"tag_counts rebuilt: {n} tags")
+
+
+async def reconcile_tag_counts(args):
+    drift = await counters.reconcile_tag_counts(dry_run=args.dry_run)
+    for tag, (was, now) in sorted(drift.items()):
+        print(f"{tag}: {was} -> {now}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"{len(drift)} drifted tags {action}")
+
+
+async def reconcile_reaction_counts(args):
+    drift = await counters.reconcile_reaction_counts(dry_run=args.dry_run)
+    for post_id, (was, now) in sorted(drift.items()):
+        print(f"{post_id}: {was} -> {now}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"{len(drift)} drifted posts {action}")
+
+
+async def reconcile_comment_counts(args):
+    drift = await counters.reconcile_comment_counts(dry_run=args.dry_run)
+    for post_id, (was, now) in sorted(drift.items()):
+        print(f"{post_id}: {was} -> {now}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"{len(drift)} drifted posts {action}")
+
+
+async def backfill_summaries(args):
+    n = await summary.backfill_summaries(everything=args.all)
+    print(f"summaries written for {n} posts")
+
+
+async def backfill_trending(args):
+    n = await trending.backfill()
+    print(f"trend scores seeded for {n} posts")
+
+
+async def renormalize_trending(args):
+    n = await trending.renormalize(force=True)
+    print(f"epoch moved to {trending.epoch:%Y-%m-%d %H:%M:%S}, {n} scores rescaled")
+
+
+async def rebuild_related(args):
+    n = await related_index.rebuild_all()
+    print(f"related posts rebuilt for {n} posts")
+
+
+def print_index_plan(plans):
+    for name, p in plans.items():
+        for idx, keys, _ in p["create"]:
+            print(f"+ {name}.{idx} {keys}")
+        for idx, keys, _ in p["changed"]:
+            print(f"~ {name}.{idx} {keys} (differs from the live index)")
+        for idx, other in p["exists_as"]:
+            print(f"= {name}.{idx} exists as {other!r}")
+        for idx in p["extra"]:
+            print(f"? {name}.{idx} is not in the manifest")
+
+
+async def index_command(args):
+    if args.action == "plan":
+        plans = await indexes.plan()
+        print_index_plan(plans)
+        pending = sum(len(p["create"]) + len(p["changed"]) for p in plans.values())
+        print(f"{pending} index changes pending")
+    elif args.action == "apply":
+        plans, errors = await indexes.apply(rebuild_changed=args.rebuild_changed, drop_extra=args.drop_extra)
+        print_index_plan(plans)
+        for name, failed in errors.items():
+            for idx, error in failed.items():
+                print(f"! {name}.{idx}: {error}")
+        if errors:
+            raise SystemExit(1)
+    else:
+        result = await indexes.report()
+        for name, idle in result["unused"].items():
+            for idx, since in idle:
+                print(f"unused: {name}.{idx} (no ops since {since:%Y-%m-%d %H:%M})")
+        for query in result["collscans"]:
+            print(f"collection scan: {query}")
+        if not result["unused"] and not result["collscans"]:
+            print("every index is used and no hot query scans a collection")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.manage")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("rebuild-tag-counts").set_defaults(func=rebuild_tag_counts)
+
+    p = sub.add_parser("reconcile-tag-counts")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=reconcile_tag_counts)
+
+    p = sub.add_parser("reconcile-reaction-counts")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=reconcile_reaction_counts)
+
+    p = sub.add_parser("reconcile-comment-counts")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=reconcile_comment_counts)
+
+    p = sub.add_parser("backfill-summaries")
+    p.add_argument("--all", action="store_true", help="recompute for every post, not just missing ones")
+    p.set_defaults(func=backfill_summaries)
+
+    sub.add_parser("backfill-trending").set_defaults(func=backfill_trending)
+    sub.add_parser("renormalize-trending").set_defaults(func=renormalize_trending)
+    sub.add_parser("rebuild-related").set_defaults(func=rebuild_related)
+
+    p = sub.add_parser("indexes")
+    p.add_argument("action", choices=["plan", "apply", "report"])
+    p.add_argument("--rebuild-changed", action="store_true", help="drop and recreate indexes whose spec changed")
+    p.add_argument("--drop-extra", action="store_true", help="drop indexes that are not in the manifest")
+    p.set_defaults(func=index_command)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from pymongo import monitoring
+
+registry = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    registry=registry,
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+    registry=registry,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    registry=registry,
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=registry,
+)
+MONGO_DOCS = Counter(
+    "mongo_documents_returned_total",
+    "Documents returned to the app by MongoDB commands",
+    ["collection", "command"],
+    registry=registry,
+)
+MONGO_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that failed",
+    ["collection", "command"],
+    registry=registry,
+)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    registry=registry,
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Connection checkouts that failed (timeout, pool closed, connection error)",
+    ["reason"],
+    registry=registry,
+)
+POOL_WAITING = Gauge(
+    "mongo_pool_waiting",
+    "Operations currently waiting for a pooled connection",
+    registry=registry,
+)
+SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected by admission control",
+    ["reason"],
+    registry=registry,
+)
+POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections",
+    "Open pooled connections",
+    registry=registry,
+)
+
+
+def render():
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight counts.
+
+    Requests are labelled with the matched route template (not the raw path)
+    so ids don't blow up label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            REQUESTS.labels(method, route, str(status)).inc()
+
+
+def _collection(event) -> str:
+    if event.command_name == "getMore":
+        name = event.command.get("collection")
+    else:
+        name = event.command.get(event.command_name)
+    return name if isinstance(name, str) else ""
+
+
+def _docs_returned(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] else 0
+    return 0
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per-collection/per-command timings, fed by pymongo command events."""
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = _collection(event)
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        docs = _docs_returned(event.reply)
+        if docs:
+            MONGO_DOCS.labels(collection, event.command_name).inc(docs)
+
+    def failed(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(collection, event.command_name).inc()
+
+
+mongo_metrics = MongoCommandMetrics()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool checkout waits, for sizing maxPoolSize.
+
+    Checkouts happen synchronously on Motor's executor threads, so the start
+    time is kept per thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self.waiting = 0
+        self.last_wait = 0.0
+        self.avg_wait = 0.0
+
+    def _finish(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        self.waiting -= 1
+        POOL_WAITING.dec()
+        if started is not None:
+            self.last_wait = time.perf_counter() - started
+            self.avg_wait += (self.last_wait - self.avg_wait) * 0.1
+            POOL_CHECKOUT_WAIT.observe(self.last_wait)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        self.waiting += 1
+        POOL_WAITING.inc()
+
+    def connection_checked_out(self, event):
+        self._finish()
+
+    def connection_check_out_failed(self, event):
+        self._finish()
+        POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc()
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.dec()
+
+    def connection_checked_in(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+pool_metrics = PoolMetrics()
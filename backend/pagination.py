@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(doc) -> str:
+    """Opaque token pointing just after `doc` in a (created_at, _id) desc feed."""
+    ms = (doc["created_at"] - EPOCH) // timedelta(milliseconds=1)
+    raw = json.dumps([ms, str(doc["_id"])], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ms, id_str = json.loads(raw)
+        return EPOCH + timedelta(milliseconds=int(ms)), ObjectId(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(query: dict, token: str) -> dict:
+    """Restrict `query` to documents strictly older than the cursor position."""
+    created_at, _id = decode_cursor(token)
+    query["$or"] = [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": _id}},
+    ]
+    return query
+
+
+def encode_score_cursor(score: float, _id) -> str:
+    """Like encode_cursor, for lists ranked by (score, _id) desc."""
+    raw = json.dumps([score, str(_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_score_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        score, id_str = json.loads(raw)
+        return float(score), ObjectId(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,152 @@
+import asyncio
+import math
+import os
+from datetime import datetime
+
+from backend.cache import TTLCache
+from backend.db import posts_col, related_col, tag_counts_col
+from backend.invalidation import invalidation_bus
+
+RELATED_SIZE = int(os.getenv("RELATED_SIZE", "10"))
+# newest posts looked at per shared tag; bounds the work per rebuild
+RELATED_CANDIDATES_PER_TAG = int(os.getenv("RELATED_CANDIDATES_PER_TAG", "50"))
+RELATED_MAX_TAGS = 10
+
+# post id -> [neighbour ids]
+related_cache = TTLCache(
+    maxsize=int(os.getenv("RELATED_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("RELATED_CACHE_TTL", "300")),
+)
+
+
+async def compute_related(_id, tags, size: int = RELATED_SIZE) -> list:
+    """Top `size` posts sharing tags with this one, rarer shared tags counting more.
+
+    Candidates are the newest posts carrying each tag, read off tags_feed_idx;
+    ties go to the newer post.
+    """
+    tags = list(dict.fromkeys(tags or ()))[:RELATED_MAX_TAGS]
+    if not tags:
+        return []
+
+    total = await posts_col.estimated_document_count()
+    counts = {d["_id"]: d["count"] async for d in tag_counts_col.find({"_id": {"$in": tags}})}
+    weight = {t: math.log(1 + total / max(1, counts.get(t, 1))) for t in tags}
+
+    def candidates(tag):
+        return (
+            posts_col.find({"tags": tag, "_id": {"$ne": _id}}, {"tags": 1, "created_at": 1})
+            .sort([("created_at", -1), ("_id", -1)])
+            .limit(RELATED_CANDIDATES_PER_TAG)
+            .to_list(length=RELATED_CANDIDATES_PER_TAG)
+        )
+
+    scores, created = {}, {}
+    for docs in await asyncio.gather(*(candidates(t) for t in tags)):
+        for d in docs:
+            if d["_id"] in scores:
+                continue
+            scores[d["_id"]] = sum(weight[t] for t in set(d.get("tags") or ()) & weight.keys())
+            created[d["_id"]] = d.get("created_at") or datetime.min
+
+    ranked = sorted(scores, key=lambda k: (scores[k], created[k], k), reverse=True)
+    return ranked[:size]
+
+
+class RelatedIndex:
+    """Per-post top-N neighbour lists in the `related` collection.
+
+    Lists are rebuilt in the background when a post's tags change. The posts
+    on its old and new lists get theirs dropped, since the changed post may
+    now belong on them (or no longer does); those are rebuilt on their next
+    read.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = concurrency
+        self._sem = None
+        self._tasks = set()
+        self.rebuilds = 0
+        self.dropped = 0
+        self.failures = 0
+
+    async def get(self, _id):
+        """Neighbour ids for a post, or None if the post doesn't exist."""
+        return await related_cache.get_or_load(_id, lambda: self.load(_id))
+
+    async def load(self, _id):
+        doc = await related_col.find_one({"_id": _id}, {"ids": 1})
+        if doc:
+            return doc["ids"]
+        post = await posts_col.find_one({"_id": _id}, {"tags": 1})
+        if not post:
+            return None
+        return await self.rebuild(_id, post.get("tags"))
+
+    async def rebuild(self, _id, tags) -> list:
+        ids = await compute_related(_id, tags)
+        await related_col.replace_one(
+            {"_id": _id}, {"ids": ids, "tags": tags, "built_at": datetime.utcnow()}, upsert=True
+        )
+        self.rebuilds += 1
+        return ids
+
+    async def refresh(self, _id, tags):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        async with self._sem:
+            old = await related_col.find_one({"_id": _id}, {"ids": 1})
+            ids = await self.rebuild(_id, tags)
+            related_cache.invalidate(_id)
+
+            affected = (set(ids) | set(old["ids"] if old else ())) - {_id}
+            if affected:
+                res = await related_col.delete_many({"_id": {"$in": list(affected)}})
+                self.dropped += res.deleted_count
+                for other in affected:
+                    related_cache.invalidate(other)
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+            print("Warning: related posts refresh failed:", task.exception())
+
+    def schedule(self, _id, tags):
+        """Rebuild a post's list (and dirty its neighbours') without blocking the request."""
+        self._spawn(self.refresh(_id, tags))
+
+    def forget(self, _id):
+        related_cache.invalidate(_id)
+        self._spawn(related_col.delete_one({"_id": _id}))
+
+    async def rebuild_all(self) -> int:
+        """Rebuild every post's list from scratch; returns the posts done."""
+        n = 0
+        async for post in posts_col.find({}, {"tags": 1}):
+            await self.rebuild(post["_id"], post.get("tags"))
+            n += 1
+        related_cache.clear()
+        return n
+
+    def stats(self):
+        return {
+            "cached": len(related_cache),
+            "pending": len(self._tasks),
+            "rebuilds": self.rebuilds,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+related_index = RelatedIndex()
+
+# lists rebuilt or dropped by another worker
+invalidation_bus.subscribe(
+    "related", lambda op, _id, change: related_cache.invalidate(_id), reset=related_cache.clear
+)
@@ -1 +1,2 @@
+from .bulk import router as bulk
 from .posts import router as posts
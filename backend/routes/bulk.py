@@ -0,0 +1,186 @@
+import json
+import time
+from datetime import datetime, timezone
+from typing import Literal
+
+from bson.objectid import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pymongo.errors import BulkWriteError
+
+from ..db import posts_col, comments_col
+from ..schemas import PostIn
+from ..auth import is_admin, require_user
+from ..counters import tag_delta, apply_tag_delta
+from ..encoding import dumps
+from ..invalidation import invalidation_bus
+from .posts import feed_snapshots, new_post_doc
+
+router = APIRouter(prefix="/posts", tags=["bulk"])
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_lines(stream):
+    buf = b""
+    async for chunk in stream:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line
+    if buf:
+        yield buf
+
+
+# stored fields a restore takes from the file instead of the importer / now
+RESTORED_FIELDS = ("author_id", "views", "reactions", "comment_count")
+
+
+def parse_time(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def restored_post_doc(raw: dict, payload: PostIn, user) -> dict:
+    """A post from an export line, keeping its id, author, timestamps and counters."""
+    doc = new_post_doc(payload, user)
+    for field in RESTORED_FIELDS:
+        if raw.get(field) is not None:
+            doc[field] = raw[field]
+    doc["created_at"] = parse_time(raw.get("created_at")) or doc["created_at"]
+    doc["updated_at"] = parse_time(raw.get("updated_at"))
+    if raw.get("_id") is not None:
+        if not ObjectId.is_valid(str(raw["_id"])):
+            raise ValueError(f"invalid _id {raw['_id']!r}")
+        doc["_id"] = ObjectId(str(raw["_id"]))
+    return doc
+
+
+def _rate(n: int, elapsed: float) -> float:
+    return round(n / elapsed, 1) if elapsed > 0 else 0.0
+
+
+@router.post("/bulk")
+async def bulk_import(
+    request: Request,
+    mode: Literal["new", "restore"] = "new",
+    user=Depends(require_user),
+):
+    """Insert posts from an NDJSON body, one PostIn object per line.
+
+    `new` creates posts authored by the caller, as POST /api/posts would.
+    `restore` (admins only) re-imports `GET /export` output as it was: each
+    post keeps its _id, author, timestamps and counters, and lines whose
+    _id already exists are reported as errors, so a restore can be re-run.
+    """
+    if mode == "restore" and not is_admin(user):
+        raise HTTPException(status_code=403, detail="Restoring an export is admin only")
+    started = time.perf_counter()
+    inserted, failed, errors = 0, 0, []
+    batch, batch_lines = [], []
+
+    def report(line_no, error):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line_no, "error": error})
+
+    async def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        failed_at = {}
+        # this import touches the snapshots itself, so skip the echoes
+        for doc in batch:
+            doc.setdefault("_id", ObjectId())
+            invalidation_bus.expect("posts", doc["_id"])
+        try:
+            await posts_col.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed_at = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+        except Exception:
+            for doc in batch:
+                invalidation_bus.unexpect("posts", doc["_id"])
+            raise
+
+        delta = tag_delta()
+        added = len(batch) - len(failed_at)
+        for i, doc in enumerate(batch):
+            if i in failed_at:
+                invalidation_bus.unexpect("posts", doc["_id"])
+                report(batch_lines[i], failed_at[i])
+            else:
+                inserted += 1
+                delta.update(tag_delta(new_tags=doc["tags"]))
+        batch.clear()
+        batch_lines.clear()
+
+        # per batch, so what's inserted is counted even if the client drops
+        # or a later batch fails
+        await apply_tag_delta(delta)
+        if added:
+            feed_snapshots.touch(list(delta))
+
+    line_no = 0
+    async for line in iter_lines(request.stream()):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+            payload = PostIn.parse_obj(raw)
+            doc = restored_post_doc(raw, payload, user) if mode == "restore" else new_post_doc(payload, user)
+        except ValueError as e:
+            report(line_no, str(e))
+            continue
+
+        batch.append(doc)
+        batch_lines.append(line_no)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+    await flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"bulk import: {inserted} posts in {elapsed:.2f}s ({_rate(inserted, elapsed)} docs/sec), {failed} failed")
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "docs_per_sec": _rate(inserted, elapsed),
+    }
+
+
+@router.get("/export")
+async def export(
+    kind: Literal["posts", "comments"] = "posts",
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000),
+    user=Depends(require_user),
+):
+    """Stream a whole collection as NDJSON without buffering it in memory."""
+    col = posts_col if kind == "posts" else comments_col
+
+    async def lines():
+        started = time.perf_counter()
+        n = 0
+        chunk = []
+        try:
+            async for doc in col.find({}, batch_size=batch_size):
+                chunk.append(dumps(doc))
+                n += 1
+                if len(chunk) >= batch_size:
+                    yield b"\n".join(chunk) + b"\n"
+                    chunk = []
+            if chunk:
+                yield b"\n".join(chunk) + b"\n"
+        finally:
+            elapsed = time.perf_counter() - started
+            print(f"export {kind}: {n} docs in {elapsed:.2f}s ({_rate(n, elapsed)} docs/sec)")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,25 +1,116 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, Header
+from typing import List, Literal, Optional, Union
 from bson.objectid import ObjectId
 from datetime import datetime
+import asyncio
+import os
 
 from ..db import posts_col, comments_col, reactions_col
-from ..schemas import PostIn, PostOut, PostUpdate, CommentIn
+from ..schemas import PostIn, PostOut, PostSummary, PostUpdate, CommentIn, SearchHit, PostBatchIn, PostBatchOut
 from ..auth import require_user
+from ..cache import MISS, TTLCache
+from ..counters import (
+    tag_delta,
+    apply_tag_delta,
+    top_tags as read_top_tags,
+    reaction_delta,
+    reaction_totals,
+)
+from ..encoding import dumps
+from ..invalidation import changed_fields, invalidation_bus
+from ..http_cache import (
+    CACHE_CONTROL,
+    VALIDATOR_PROJECTION,
+    etag_matches,
+    feed_etag,
+    last_modified,
+    not_modified,
+    post_etag,
+    validator_headers,
+)
+from ..summary import summarize
+from ..snapshots import FeedSnapshots, SNAPSHOT_PAGES, SNAPSHOT_TAGS, make_snapshot, snapshot_response
+from ..pagination import after_cursor, encode_cursor, encode_score_cursor, decode_score_cursor
+from ..updates import plan_post_update, compile_post_update, apply_post_update, version_filter, utcnow_ms
+from ..related import RELATED_SIZE, related_index
+from ..trending import COMMENT_WEIGHT, REACTION_WEIGHT, increment, trending
+from ..views import view_buffer
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+FEED_SORT = [("created_at", -1), ("_id", -1)]
+
+# only what to_out reads, so list queries never drag extra fields over the wire
+POST_PROJECTION = {
+    f: 1
+    for f in (
+        "author_id", "content", "media_url", "category_id", "status",
+        "tags", "views", "reactions", "comment_count", "created_at", "updated_at",
+        "title", "excerpt", "word_count",
+    )
+}
+
+# feed cards never show the body, so summary lists don't load it at all
+SUMMARY_PROJECTION = {f: 1 for f in POST_PROJECTION if f != "content"}
+
+# normalized search -> ranked [(score, _id)] (score desc, _id desc), so repeat
+# searches and later pages skip the text query and only $in their own page
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "500"))
+search_cache = TTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "30")),
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    # a (float, ObjectId) tuple and its list slot, roughly
+    sizeof=lambda hits: 120 * len(hits) + 64,
+)
+
+# opt-in: encode trusted DB output straight to bytes and skip re-validating
+# it against response_model
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# post id -> (serialized PostOut bytes, ETag, Last-Modified, reaction totals)
+post_cache = TTLCache(
+    maxsize=int(os.getenv("POST_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("POST_CACHE_TTL", "30")),
+    max_bytes=int(os.getenv("POST_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sizeof=lambda entry: len(entry[0]),
+)
+
 
 def to_out(doc):
     return {
         "id": str(doc["_id"]),
         "author_id": doc.get("author_id"),
         "content": doc.get("content"),
+        "title": doc.get("title"),
+        "excerpt": doc.get("excerpt"),
+        "word_count": doc.get("word_count", 0),
         "media_url": doc.get("media_url", ""),
         "category_id": doc.get("category_id"),
         "status": doc.get("status"),
         "tags": doc.get("tags", []),
         "views": doc.get("views", 0),
+        "reactions": doc.get("reactions") or {},
+        "comment_count": doc.get("comment_count", 0),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+def to_summary(doc):
+    return {
+        "id": str(doc["_id"]),
+        "author_id": doc.get("author_id"),
+        "title": doc.get("title"),
+        "excerpt": doc.get("excerpt"),
+        "word_count": doc.get("word_count", 0),
+        "media_url": doc.get("media_url", ""),
+        "category_id": doc.get("category_id"),
+        "status": doc.get("status"),
+        "tags": doc.get("tags", []),
+        "views": doc.get("views", 0),
+        "reactions": doc.get("reactions") or {},
+        "comment_count": doc.get("comment_count", 0),
         "created_at": doc.get("created_at"),
         "updated_at": doc.get("updated_at"),
     }
@@ -32,26 +123,166 @@ def oid(id_str: str) -> ObjectId:
     return ObjectId(id_str)
 
 
-@router.post("", response_model=PostOut)
-async def create_post(payload: PostIn, user=Depends(require_user)):
+def render_feed(docs: list, view: str):
+    if view == "summary":
+        return [to_summary(d) for d in docs]
+    return [to_out(d) for d in docs]
+
+
+def feed_response(items: list, headers: dict):
+    if FAST_JSON:
+        return Response(content=dumps(items), media_type="application/json", headers=headers)
+    return items
+
+
+def page_validators(response: Response, docs, next_cursor, view, policy, if_none_match):
+    """Set ETag/Cache-Control for a feed page; a 304 response if the client's copy is current."""
+    headers = validator_headers(feed_etag(docs, view, next_cursor), policy)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, headers["ETag"]):
+        return headers, not_modified(headers)
+    response.headers.update(headers)
+    return headers, None
+
+
+async def fetch_page(
+    query: dict,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    projection: dict = POST_PROJECTION,
+):
+    """One feed page in (created_at, _id) desc order plus the cursor for the next one.
+
+    `skip` is only honoured when no cursor is given, for older clients.
+    """
+    if cursor:
+        after_cursor(query, cursor)
+    find = posts_col.find(query, projection).sort(FEED_SORT)
+    if skip and not cursor:
+        find = find.skip(skip)
+
+    docs = await find.limit(limit).to_list(length=limit)
+    next_cursor = encode_cursor(docs[-1]) if len(docs) == limit else None
+    return docs, next_cursor
+
+
+DEFAULT_LIMIT = 20
+
+
+async def build_feed_snapshot(tag):
+    """First SNAPSHOT_PAGES default-size pages of a feed, in both views."""
+    pages = {}
+    cursor = None
+    for _ in range(SNAPSHOT_PAGES):
+        query = {"tags": tag} if tag else {}
+        # the full projection covers the summary view too
+        docs, next_cursor = await fetch_page(query, DEFAULT_LIMIT, cursor=cursor)
+        for view in ("full", "summary"):
+            etag = feed_etag(docs, view, next_cursor)
+            pages[(view, cursor)] = make_snapshot(dumps(render_feed(docs, view)), etag, next_cursor)
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    return pages
+
+
+async def snapshot_feeds():
+    return [t["tag"] for t in await read_top_tags(SNAPSHOT_TAGS)]
+
+
+feed_snapshots = FeedSnapshots(build_feed_snapshot, snapshot_feeds)
+
+# fields whose changes don't move a post within any feed
+COUNTER_FIELDS = {"views", "comment_count", "reactions", "trend_score", "trend_epoch"}
+
+
+def change_tags(op, change):
+    """Every tag the post had before or after the write, or None when that's unknown."""
+    after = change.get("fullDocument")
+    before = change.get("fullDocumentBeforeChange")
+    if op == "insert":
+        return after.get("tags") if after else None
+    if op == "delete":
+        return before.get("tags") if before else None
+    if before is None and (op == "replace" or "tags" in {f.split(".")[0] for f in changed_fields(change)}):
+        return None  # the tags the post left are gone with the pre-image
+    if after is None and before is None:
+        return None  # deleted since; the lookup found nothing
+    return [*((before or {}).get("tags") or ()), *((after or {}).get("tags") or ())]
+
+
+def on_post_change(op, _id, change):
+    """A post was written by another worker."""
+    post_cache.invalidate(_id)
+    if op == "update" and {f.split(".")[0] for f in changed_fields(change)} <= COUNTER_FIELDS:
+        # the periodic snapshot refresh picks counters up
+        return
+    tags = change_tags(op, change)
+    if tags is None:
+        feed_snapshots.touch_all()
+    else:
+        feed_snapshots.touch(tags)
+
+
+def reset_post_caches():
+    post_cache.clear()
+    search_cache.clear()
+    feed_snapshots.touch_all()
+
+
+invalidation_bus.subscribe("posts", on_post_change, reset=reset_post_caches)
+
+
+def new_post_doc(payload: PostIn, user) -> dict:
     doc = payload.dict()
     doc["author_id"] = user.get("username") or user.get("id")
 
+    doc.update(summarize(doc["content"]))
     doc["created_at"] = datetime.utcnow()
     doc["updated_at"] = None
-    res = await posts_col.insert_one(doc)
-    doc["_id"] = res.inserted_id
+    return doc
+
+
+@router.post("", response_model=PostOut)
+async def create_post(payload: PostIn, user=Depends(require_user)):
+    doc = new_post_doc(payload, user)
+    doc["_id"] = ObjectId()
+    invalidation_bus.expect("posts", doc["_id"])
+    try:
+        await posts_col.insert_one(doc)
+    except Exception:
+        invalidation_bus.unexpect("posts", doc["_id"])
+        raise
+    await apply_tag_delta(tag_delta(new_tags=doc["tags"]))
+    feed_snapshots.touch(doc["tags"])
+    related_index.schedule(doc["_id"], doc["tags"])
     return to_out(doc)
 
 
-@router.get("", response_model=List[PostOut])
+FeedView = Literal["full", "summary"]
+FeedItems = List[Union[PostOut, PostSummary]]
+
+
+@router.get("", response_model=FeedItems)
 async def list_posts(
+    response: Response,
     tag: Optional[str] = None,
     author: Optional[str] = None,
     q: Optional[str] = None,
-    limit: int = Query(20, ge=1, le=100),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    view: FeedView = "full",
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
 ):
+    if not (author or q or skip) and limit == DEFAULT_LIMIT and feed_snapshots.tracks(tag or None):
+        snap = feed_snapshots.get(tag or None, view, cursor)
+        if snap is not None:
+            return snapshot_response(snap, "feed", accept_encoding, if_none_match)
+
     query = {}
     if tag:
         query["tags"] = tag
@@ -60,66 +291,249 @@ async def list_posts(
     if q:
         query["$text"] = {"$search": q}
 
-    cursor = posts_col.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    docs = []
-    async for d in cursor:
-        docs.append(to_out(d))
-    return docs
+    projection = SUMMARY_PROJECTION if view == "summary" else POST_PROJECTION
+    docs, next_cursor = await fetch_page(query, limit, skip, cursor, projection)
+    headers, unchanged = page_validators(response, docs, next_cursor, view, "feed", if_none_match)
+    if unchanged:
+        return unchanged
+    return feed_response(render_feed(docs, view), headers)
 
-@router.get("/me", response_model=List[PostOut])
+@router.get("/me", response_model=FeedItems)
 async def my_posts(
+    response: Response,
     user=Depends(require_user),
     limit: int = Query(20, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    view: FeedView = "full",
+    if_none_match: Optional[str] = Header(None),
 ):
     author = user.get("username") or user.get("id")
-    cursor = posts_col.find({"author_id": author}).sort("created_at", -1).skip(skip).limit(limit)
-    docs = []
-    async for d in cursor:
-        docs.append(to_out(d))
-    return docs
+    projection = SUMMARY_PROJECTION if view == "summary" else POST_PROJECTION
+    docs, next_cursor = await fetch_page({"author_id": author}, limit, skip, cursor, projection)
+    headers, unchanged = page_validators(response, docs, next_cursor, view, "private", if_none_match)
+    if unchanged:
+        return unchanged
+    return feed_response(render_feed(docs, view), headers)
 
 
-@router.get("/{post_id}", response_model=PostOut)
-async def get_post(post_id: str):
-    doc = await posts_col.find_one({"_id": oid(post_id)})
+async def ranked_search(q: str, tag: Optional[str], author: Optional[str]):
+    query = {"$text": {"$search": q}}
+    if tag:
+        query["tags"] = tag
+    if author:
+        query["author_id"] = author
+
+    score = {"$meta": "textScore"}
+    cursor = (
+        posts_col.find(query, {"_id": 1, "score": score})
+        .sort([("score", score), ("_id", -1)])
+        .limit(SEARCH_MAX_RESULTS)
+    )
+    return [(d["score"], d["_id"]) async for d in cursor]
+
+
+@router.get("/search", response_model=List[SearchHit])
+async def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    tag: Optional[str] = None,
+    author: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Full-text search ranked by relevance, best matches first."""
+    normalized = " ".join(q.lower().split())
+    if not normalized:
+        raise HTTPException(status_code=400, detail="Empty search query")
+
+    key = (normalized, tag or None, author or None)
+    hits = await search_cache.get_or_load(key, lambda: ranked_search(normalized, *key[1:]))
+
+    start = 0
+    if cursor:
+        after = decode_score_cursor(cursor)
+        start = next((i for i, h in enumerate(hits) if h < after), len(hits))
+
+    ranked = hits[start:start + limit]
+    next_cursor = None
+    if start + limit < len(hits):
+        next_cursor = encode_score_cursor(*ranked[-1])
+
+    ids = [_id for _, _id in ranked]
+    docs = await posts_col.find({"_id": {"$in": ids}}, SUMMARY_PROJECTION).to_list(length=len(ids))
+    by_id = {d["_id"]: d for d in docs}
+    # posts deleted since the search was ranked just drop out
+    page = [{**to_summary(by_id[_id]), "score": score} for score, _id in ranked if _id in by_id]
+    headers, unchanged = page_validators(response, page, next_cursor, "search", "search", if_none_match)
+    if unchanged:
+        return unchanged
+    return feed_response(page, headers)
+
+
+@router.get("/trending", response_model=FeedItems)
+async def trending_posts(
+    response: Response,
+    tag: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=100),
+    view: FeedView = "summary",
+    if_none_match: Optional[str] = Header(None),
+):
+    """Posts with the most recent engagement, hottest first."""
+    query = {"trend_score": {"$gt": 0}}
+    if tag:
+        query["tags"] = tag
+    projection = SUMMARY_PROJECTION if view == "summary" else POST_PROJECTION
+    docs = await (
+        posts_col.find(query, projection)
+        .sort([("trend_score", -1), ("_id", -1)])
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    headers, unchanged = page_validators(response, docs, None, view, "feed", if_none_match)
+    if unchanged:
+        return unchanged
+    return feed_response(render_feed(docs, view), headers)
+
+
+async def load_post_payload(_id: ObjectId):
+    doc = await posts_col.find_one({"_id": _id}, POST_PROJECTION)
     if not doc:
-        raise HTTPException(status_code=404, detail="Post not found")
-    return to_out(doc)
+        return None
+    return dumps(to_out(doc)), post_etag(doc), last_modified(doc), reaction_totals(doc)
 
 
-@router.put("/{post_id}", response_model=PostOut)
-async def update_post(post_id: str, payload: PostUpdate, user=Depends(require_user)):
+BATCH_MAX_IDS = int(os.getenv("POST_BATCH_MAX_IDS", "100"))
+
+
+async def get_posts_batch(id_strs: List[str]) -> Response:
+    """Posts in request order, null where missing, served from post_cache where possible.
+
+    Cached entries are already serialized, so their bytes are spliced into
+    the response as-is; only ids the cache doesn't hold go to Mongo, in one
+    $in query.
+    """
+    if len(id_strs) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per batch")
+    ids = [oid(s) for s in id_strs]
+
+    bodies = {}
+    for _id in dict.fromkeys(ids):
+        entry = post_cache.get(_id)
+        if entry is not MISS:
+            bodies[_id] = entry[0]
+
+    todo = [_id for _id in dict.fromkeys(ids) if _id not in bodies]
+    if todo:
+        docs = await posts_col.find({"_id": {"$in": todo}}, POST_PROJECTION).to_list(length=len(todo))
+        # not written back to post_cache: without get_or_load's bookkeeping a
+        # concurrent update's invalidation could be overwritten by this read
+        bodies.update((d["_id"], dumps(to_out(d))) for d in docs)
+
+    missing = [str(_id) for _id in ids if _id not in bodies]
+    body = b'{"posts":[' + b",".join(bodies.get(_id, b"null") for _id in ids) + b'],"missing":' + dumps(missing) + b"}"
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": CACHE_CONTROL["post"]})
+
+
+@router.get("/batch", response_model=PostBatchOut)
+async def get_posts_batch_query(ids: List[str] = Query(..., description="repeat ?ids= or comma-separate them")):
+    return await get_posts_batch([s for value in ids for s in value.split(",") if s])
+
+
+@router.post("/batch", response_model=PostBatchOut)
+async def get_posts_batch_body(payload: PostBatchIn):
+    return await get_posts_batch(payload.ids)
+
+
+@router.get("/{post_id}", response_model=PostOut)
+async def get_post(post_id: str, if_none_match: Optional[str] = Header(None)):
     _id = oid(post_id)
-    p = payload.dict(exclude_none=True)
+    if if_none_match and _id not in post_cache:
+        # revalidate against the version fields alone before loading the body
+        doc = await posts_col.find_one({"_id": _id}, VALIDATOR_PROJECTION)
+        if doc and etag_matches(if_none_match, post_etag(doc)):
+            return not_modified(validator_headers(post_etag(doc), "post", last_modified(doc)))
+
+    entry = await post_cache.get_or_load(_id, lambda: load_post_payload(_id))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Post not found")
 
-    if "push_tag" in p:
-        await posts_col.update_one({"_id": _id}, {"$addToSet": {"tags": p["push_tag"]}})
-    if "pull_tag" in p:
-        await posts_col.update_one({"_id": _id}, {"$pull": {"tags": p["pull_tag"]}})
-    if "inc_views" in p:
-        await posts_col.update_one({"_id": _id}, {"$inc": {"views": p["inc_views"]}})
+    body, etag, modified, _ = entry
+    headers = validator_headers(etag, "post", modified)
+    if etag_matches(if_none_match, etag):
+        return not_modified(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    update = {}
-    for field in ("content", "media_url", "category_id", "status", "tags"):
-        if field in p:
-            update[field] = p[field]
 
-    if update:
-        update["updated_at"] = datetime.utcnow()
-        await posts_col.update_one({"_id": _id}, {"$set": update})
+@router.post("/{post_id}/view", status_code=202)
+async def record_view(post_id: str):
+    view_buffer.hit(oid(post_id))
+    return {"ok": True}
+
+
+@router.put("/{post_id}", response_model=PostOut)
+async def update_post(
+    post_id: str,
+    payload: PostUpdate,
+    user=Depends(require_user),
+    if_match: Optional[str] = Header(None),
+):
+    _id = oid(post_id)
+    plan = plan_post_update(payload.dict(exclude_none=True), utcnow_ms())
+    update = compile_post_update(plan)
+
+    query = {"_id": _id}
+    if if_match:
+        query.update(version_filter(if_match))
+
+    if not update:
+        doc = before = await posts_col.find_one(query)
+    else:
+        # one atomic write; the pre-image gives the tag diff for tag_counts
+        # and the new document follows from it deterministically
+        invalidation_bus.expect("posts", _id)
+        try:
+            before = await posts_col.find_one_and_update(query, update)
+        except Exception:
+            invalidation_bus.unexpect("posts", _id)
+            raise
+        doc = apply_post_update(before, plan) if before else None
+        if before is None:
+            invalidation_bus.unexpect("posts", _id)
 
-    doc = await posts_col.find_one({"_id": _id})
     if not doc:
+        if if_match and await posts_col.count_documents({"_id": _id}, limit=1):
+            raise HTTPException(status_code=412, detail="Post was modified by someone else")
         raise HTTPException(status_code=404, detail="Post not found")
+
+    if update:
+        post_cache.invalidate(_id)
+        await apply_tag_delta(tag_delta(before.get("tags"), doc.get("tags")))
+        if plan["set"] or plan["push"] is not None or plan["pull"] is not None:
+            # a views-only edit doesn't change what any feed shows first
+            feed_snapshots.touch([*(before.get("tags") or ()), *(doc.get("tags") or ())])
+        if set(before.get("tags") or ()) != set(doc.get("tags") or ()):
+            related_index.schedule(_id, doc.get("tags"))
     return to_out(doc)
 
 
 @router.delete("/{post_id}")
 async def delete_post(post_id: str, user=Depends(require_user)):
-    res = await posts_col.delete_one({"_id": oid(post_id)})
-    if res.deleted_count == 0:
+    _id = oid(post_id)
+    invalidation_bus.expect("posts", _id)
+    try:
+        doc = await posts_col.find_one_and_delete({"_id": _id}, projection={"tags": 1})
+    except Exception:
+        invalidation_bus.unexpect("posts", _id)
+        raise
+    post_cache.invalidate(_id)
+    if not doc:
+        invalidation_bus.unexpect("posts", _id)
         raise HTTPException(status_code=404, detail="Post not found")
+    await apply_tag_delta(tag_delta(old_tags=doc.get("tags")))
+    feed_snapshots.touch(doc.get("tags"))
+    related_index.forget(_id)
     return {"deleted": post_id}
 
 
@@ -127,15 +541,23 @@ async def delete_post(post_id: str, user=Depends(require_user)):
 async def add_comment(post_id: str, payload: CommentIn, user=Depends(require_user)):
     _id = oid(post_id)
 
-    if not await posts_col.find_one({"_id": _id}):
+    # bumping the counter doubles as the existence check
+    update = trending.stage(COMMENT_WEIGHT, comment_count=increment("comment_count", 1))
+    res = await posts_col.update_one({"_id": _id}, update)
+    if not res.matched_count:
         raise HTTPException(status_code=404, detail="Post not found")
+    post_cache.invalidate(_id)
 
     doc = payload.dict()
     doc["user_id"] = user.get("username") or user.get("id")
     doc["post_id"] = post_id
     doc["created_at"] = datetime.utcnow()
 
-    res = await comments_col.insert_one(doc)
+    try:
+        res = await comments_col.insert_one(doc)
+    except Exception:
+        await posts_col.update_one({"_id": _id}, {"$inc": {"comment_count": -1}})
+        raise
 
     return {
         "id": str(res.inserted_id),
@@ -145,72 +567,161 @@ async def add_comment(post_id: str, payload: CommentIn, user=Depends(require_use
         "created_at": doc["created_at"].isoformat(),
     }
 
-@router.get("/{post_id}/comments")
-async def list_comments(post_id: str, limit: int = Query(50, ge=1, le=200)):
-    oid(post_id)
-
-    cursor = comments_col.find(
-        {"post_id": post_id},
+async def fetch_comments(post_id: str, limit: int, cursor: Optional[str] = None):
+    """A page of comments, newest first, plus the cursor for the next one."""
+    query = {"post_id": post_id}
+    if cursor:
+        after_cursor(query, cursor)
+    docs = await comments_col.find(
+        query,
         {"content": 1, "user_id": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(limit)
+    ).sort(FEED_SORT).limit(limit).to_list(length=limit)
 
     items = []
-    async for c in cursor:
+    for c in docs:
         items.append({
             "id": str(c["_id"]),
             "user_id": c.get("user_id", "user"),
             "content": c.get("content", ""),
             "created_at": c.get("created_at"),
         })
+    next_cursor = encode_cursor(docs[-1]) if len(docs) == limit else None
+    return items, next_cursor
+
+
+async def fetch_reactions(_id: ObjectId):
+    entry = await post_cache.get_or_load(_id, lambda: load_post_payload(_id))
+    return entry[3] if entry else []
+
+
+@router.get("/{post_id}/comments")
+async def list_comments(
+    post_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    oid(post_id)
+    items, next_cursor = await fetch_comments(post_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return items
 
+
+@router.delete("/{post_id}/comments/{comment_id}")
+async def delete_comment(post_id: str, comment_id: str, user=Depends(require_user)):
+    _id, cid = oid(post_id), oid(comment_id)
+    user_id = user.get("username") or user.get("id")
+
+    doc = await comments_col.find_one_and_delete(
+        {"_id": cid, "post_id": post_id, "user_id": user_id}, projection={"_id": 1}
+    )
+    if not doc:
+        if await comments_col.count_documents({"_id": cid, "post_id": post_id}, limit=1):
+            raise HTTPException(status_code=403, detail="Not your comment")
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    await posts_col.update_one({"_id": _id}, {"$inc": {"comment_count": -1}})
+    post_cache.invalidate(_id)
+    return {"deleted": comment_id}
+
+
+@router.get("/{post_id}/related", response_model=List[PostSummary])
+async def related_posts(post_id: str, limit: int = Query(5, ge=1, le=RELATED_SIZE)):
+    """Posts sharing the most (and rarest) tags with this one."""
+    _id = oid(post_id)
+    ids = await related_index.get(_id)
+    if ids is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    ids = ids[:limit]
+    docs = await posts_col.find({"_id": {"$in": ids}}, SUMMARY_PROJECTION).to_list(length=len(ids))
+    by_id = {d["_id"]: d for d in docs}
+    # neighbours deleted since the list was built just drop out
+    return feed_response([to_summary(by_id[i]) for i in ids if i in by_id], {})
+
+
+@router.get("/{post_id}/full")
+async def get_post_full(
+    post_id: str,
+    view: bool = False,
+    comments_limit: int = Query(50, ge=1, le=200),
+):
+    """Post, first page of comments and reaction totals in one response."""
+    _id = oid(post_id)
+    if view:
+        view_buffer.hit(_id)
+
+    # reaction totals come with the cached post, so a cache hit costs one comments query
+    entry, (comments, comments_cursor) = await asyncio.gather(
+        post_cache.get_or_load(_id, lambda: load_post_payload(_id)),
+        fetch_comments(post_id, comments_limit),
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    body, _, _, reactions = entry
+
+    # the post is already serialized, so splice it in rather than re-encoding
+    content = (
+        b'{"post":' + body
+        + b',"comments":' + dumps(comments)
+        + b',"comments_cursor":' + dumps(comments_cursor)
+        + b',"reactions":' + dumps(reactions) + b"}"
+    )
+    return Response(content=content, media_type="application/json")
+
 @router.post("/{post_id}/reactions")
 async def react_to_post(
     post_id: str,
     reaction_type: str = Query(..., pattern="^(like|dislike|love)$"),
     user=Depends(require_user)
 ):
-    oid(post_id)
+    _id = oid(post_id)
     user_id = user.get("_id") or user.get("id") or user.get("username")
 
-    await reactions_col.update_one(
+    # the pre-image tells us which counter (if any) the user is moving away from
+    before = await reactions_col.find_one_and_update(
         {"post_id": post_id, "user_id": user_id},
         {"$set": {"reaction_type": reaction_type, "created_at": datetime.utcnow()}},
-        upsert=True
+        projection={"reaction_type": 1},
+        upsert=True,
     )
+    await apply_reaction_delta(_id, before.get("reaction_type") if before else None, reaction_type)
     return {"ok": True, "reaction": reaction_type}
 
 
 @router.get("/{post_id}/reactions")
 async def get_reactions(post_id: str):
-    oid(post_id)
-
-    pipeline = [
-        {"$match": {"post_id": post_id}},
-        {"$group": {"_id": "$reaction_type", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$project": {"_id": 0, "reaction": "$_id", "count": 1}},
-    ]
-    return await reactions_col.aggregate(pipeline).to_list(length=10)
+    return await fetch_reactions(oid(post_id))
 
 
 @router.delete("/{post_id}/reactions")
 async def remove_reaction(post_id: str, user=Depends(require_user)):
-    oid(post_id)
+    _id = oid(post_id)
 
     user_id = user.get("_id") or user.get("id") or user.get("username")
 
-    await reactions_col.delete_one({"post_id": post_id, "user_id": user_id})
+    before = await reactions_col.find_one_and_delete(
+        {"post_id": post_id, "user_id": user_id}, projection={"reaction_type": 1}
+    )
+    if before:
+        await apply_reaction_delta(_id, before.get("reaction_type"), None)
     return {"ok": True}
 
 
+async def apply_reaction_delta(_id: ObjectId, old_type, new_type):
+    inc = reaction_delta(old_type, new_type)
+    if not inc:
+        return
+    if new_type and not old_type:
+        # only a new reaction counts as fresh engagement, not a change of mind
+        update = trending.stage(REACTION_WEIGHT, **{f: increment(f, n) for f, n in inc.items()})
+    else:
+        update = {"$inc": inc}
+    await posts_col.update_one({"_id": _id}, update)
+    post_cache.invalidate(_id)
+
+
 @router.get("/analytics/top-tags")
 async def top_tags(limit: int = Query(10, ge=1, le=50)):
-    pipeline = [
-        {"$unwind": "$tags"},
-        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": limit},
-        {"$project": {"tag": "$_id", "count": 1, "_id": 0}}
-    ]
-    return await posts_col.aggregate(pipeline).to_list(length=limit)
+    return await read_top_tags(limit)
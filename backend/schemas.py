@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class PostIn(BaseModel):
@@ -12,7 +12,28 @@ class PostIn(BaseModel):
 
 class PostOut(PostIn):
     id: str
+    title: Optional[str] = None
+    excerpt: Optional[str] = None
+    word_count: int = 0
     views: int = 0
+    reactions: Dict[str, int] = Field(default_factory=dict)
+    comment_count: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class PostSummary(BaseModel):
+    id: str
+    author_id: str
+    title: Optional[str] = None
+    excerpt: Optional[str] = None
+    word_count: int = 0
+    media_url: Optional[str] = None
+    category_id: str = "general"
+    status: str = "published"
+    tags: List[str] = Field(default_factory=list)
+    views: int = 0
+    reactions: Dict[str, int] = Field(default_factory=dict)
+    comment_count: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -26,6 +47,16 @@ class PostUpdate(BaseModel):
     push_tag: Optional[str] = None
     pull_tag: Optional[str] = None
 
+class SearchHit(PostSummary):
+    score: float
+
+class PostBatchIn(BaseModel):
+    ids: List[str]
+
+class PostBatchOut(BaseModel):
+    posts: List[Optional[PostOut]]
+    missing: List[str]
+
 class UserIn(BaseModel):
     username: str
     email: str
@@ -0,0 +1,198 @@
+import asyncio
+import gzip
+import os
+import time
+
+from fastapi import Response
+
+from backend.http_cache import etag_matches, not_modified, validator_headers
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+SNAPSHOT_PAGES = int(os.getenv("SNAPSHOT_PAGES", "3"))
+SNAPSHOT_TAGS = int(os.getenv("SNAPSHOT_TAGS", "10"))
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "10"))
+SNAPSHOT_DEBOUNCE = float(os.getenv("SNAPSHOT_DEBOUNCE", "0.2"))
+
+
+def make_snapshot(body: bytes, etag: str, next_cursor) -> dict:
+    """One feed page, encoded and compressed once, ready to send."""
+    snap = {
+        "etag": etag,
+        "next_cursor": next_cursor,
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=6),
+    }
+    if brotli is not None:
+        snap["br"] = brotli.compress(body, quality=5)
+    return snap
+
+
+def pick_encoding(accept_encoding, snap) -> str:
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.replace(" ", "")
+        try:
+            if q.startswith("q=") and float(q[2:]) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in snap and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def snapshot_response(snap: dict, policy: str, accept_encoding, if_none_match) -> Response:
+    headers = validator_headers(snap["etag"], policy)
+    if snap["next_cursor"]:
+        headers["X-Next-Cursor"] = snap["next_cursor"]
+    if etag_matches(if_none_match, snap["etag"]):
+        return not_modified(headers)
+
+    encoding = pick_encoding(accept_encoding, snap)
+    headers["Vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=snap[encoding], media_type="application/json", headers=headers)
+
+
+class FeedSnapshots:
+    """In-memory first pages of the hottest feeds.
+
+    A feed is `None` (the global feed) or a tag. `build(feed)` returns
+    {(view, cursor): snapshot} for its first pages and `feeds()` the tags
+    worth keeping. Writes call `touch`, which drops the affected feeds at
+    once and rebuilds them in the background; everything is also refreshed
+    every `interval` seconds so view and reaction counters don't go stale.
+    """
+
+    def __init__(self, build, feeds, interval: float = SNAPSHOT_REFRESH_INTERVAL, debounce: float = SNAPSHOT_DEBOUNCE):
+        self.build = build
+        self.feeds = feeds
+        self.interval = interval
+        self.debounce = debounce
+        self._pages = {}
+        self._generation = {}
+        self._dirty = set()
+        self._wake = asyncio.Event()
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.failed_rebuilds = 0
+        self.last_build_ms = 0.0
+
+    def tracks(self, feed) -> bool:
+        return feed in self._pages or feed in self._dirty
+
+    def get(self, feed, view: str, cursor):
+        snap = self._pages.get(feed, {}).get((view, cursor))
+        if snap is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snap
+
+    def touch(self, tags=()):
+        """A post in the global feed and in `tags` was written."""
+        for feed in (None, *set(tags or ())):
+            if feed is not None and not self.tracks(feed):
+                continue
+            self._pages.pop(feed, None)
+            self._generation[feed] = self._generation.get(feed, 0) + 1
+            self._dirty.add(feed)
+        self._wake.set()
+
+    def touch_all(self):
+        """Something changed but we don't know which feeds it is in."""
+        self.touch([feed for feed in (*self._pages, *self._dirty) if feed is not None])
+
+    async def rebuild(self, feed):
+        generation = self._generation.get(feed, 0)
+        started = time.perf_counter()
+        try:
+            pages = await self.build(feed)
+        except Exception:
+            self.failed_rebuilds += 1
+            raise
+        finally:
+            self.last_build_ms = (time.perf_counter() - started) * 1000
+
+        # a write landed while we were reading; keep it dirty for the next pass
+        if self._generation.get(feed, 0) != generation:
+            return False
+        self._pages[feed] = pages
+        self._dirty.discard(feed)
+        self.rebuilds += 1
+        return True
+
+    async def refresh(self):
+        """Rebuild every tracked feed and pick up changes in the top tags."""
+        wanted = [None, *await self.feeds()]
+        for feed in list(self._pages):
+            if feed not in wanted:
+                del self._pages[feed]
+        self._dirty.update(wanted)
+        await self.rebuild_dirty()
+
+    async def rebuild_dirty(self):
+        for feed in list(self._dirty):
+            try:
+                await self.rebuild(feed)
+            except Exception as e:
+                print("Warning: feed snapshot rebuild failed:", feed, e)
+
+    async def _run(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print("Warning: feed snapshot refresh failed:", e)
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print("Warning: feed snapshot refresh failed:", e)
+                continue
+            # let a burst of writes settle into one rebuild
+            await asyncio.sleep(self.debounce)
+            self._wake.clear()
+            await self.rebuild_dirty()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        pages = [snap for feed in self._pages.values() for snap in feed.values()]
+        return {
+            "feeds": len(self._pages),
+            "pages": len(pages),
+            "dirty": len(self._dirty),
+            "bytes": sum(len(s["identity"]) for s in pages),
+            "compressed_bytes": sum(len(s["gzip"]) + len(s.get("br", b"")) for s in pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "rebuilds": self.rebuilds,
+            "failed_rebuilds": self.failed_rebuilds,
+            "last_build_ms": round(self.last_build_ms, 3),
+        }
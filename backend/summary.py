@@ -0,0 +1,38 @@
+from pymongo import UpdateOne
+
+from backend.db import posts_col
+
+TITLE_CHARS = 120
+EXCERPT_CHARS = 180
+
+
+def summarize(content: str) -> dict:
+    """Feed fields derived from a post body, stored so feeds never load it.
+
+    Mirrors extractTitleFromContent/excerpt in frontend/app.js.
+    """
+    content = content or ""
+    lines = [line.strip() for line in content.split("\n") if line.strip()]
+    text = content.replace("\n", " ").strip()
+    return {
+        "title": lines[0][:TITLE_CHARS] if lines else "Untitled",
+        "excerpt": text[:EXCERPT_CHARS] + "…" if len(text) > EXCERPT_CHARS else text,
+        "word_count": len(content.split()),
+    }
+
+
+async def backfill_summaries(everything: bool = False, batch_size: int = 500):
+    """Store title/excerpt/word_count on posts written before they existed."""
+    query = {} if everything else {"word_count": {"$exists": False}}
+    updated = 0
+    ops = []
+    async for doc in posts_col.find(query, {"content": 1}, batch_size=batch_size):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": summarize(doc.get("content"))}))
+        if len(ops) >= batch_size:
+            await posts_col.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await posts_col.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
@@ -0,0 +1,175 @@
+import asyncio
+import math
+import os
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from backend.db import meta_col, posts_col
+
+# a post's trend_score is the sum of its engagement weights, each decayed
+# by exp(-(now - t) / TAU). Stored values are all scaled by exp((now - epoch) / TAU)
+# so an event only ever $adds to the score; the renormalize task moves the
+# epoch forward before that factor grows large.
+HALF_LIFE_HOURS = float(os.getenv("TREND_HALF_LIFE_HOURS", "24"))
+TAU_MS = HALF_LIFE_HOURS * 3600 * 1000 / math.log(2)
+RENORMALIZE_INTERVAL = float(os.getenv("TREND_RENORMALIZE_INTERVAL", str(HALF_LIFE_HOURS * 3600)))
+EPOCH_REFRESH = float(os.getenv("TREND_EPOCH_REFRESH", "60"))
+
+VIEW_WEIGHT = float(os.getenv("TREND_VIEW_WEIGHT", "1"))
+REACTION_WEIGHT = float(os.getenv("TREND_REACTION_WEIGHT", "5"))
+COMMENT_WEIGHT = float(os.getenv("TREND_COMMENT_WEIGHT", "8"))
+
+META_ID = "trending"
+
+
+def to_ms(dt: datetime) -> datetime:
+    return dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+
+
+def increment(field: str, n) -> dict:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, n]}
+
+
+def rescaled(epoch: datetime) -> dict:
+    """The post's current score expressed against `epoch`."""
+    shift = {"$subtract": [{"$ifNull": ["$trend_epoch", epoch]}, epoch]}
+    return {"$multiply": [{"$ifNull": ["$trend_score", 0]}, {"$exp": {"$divide": [shift, TAU_MS]}}]}
+
+
+class Trending:
+    """Epoch bookkeeping and the update stages that feed trend_score.
+
+    Each post also stores the epoch its score is scaled to, and every write
+    rescales it to the writer's epoch first, so a worker that hasn't seen a
+    new epoch yet still writes a self-consistent score.
+    """
+
+    def __init__(self):
+        self.epoch = to_ms(datetime.utcnow())
+        self._task = None
+        self.renormalized = 0
+        self.settled = 0
+        self.last_renormalize_ms = 0.0
+
+    def stage(self, weight: float, now: datetime = None, **fields) -> list:
+        """Update pipeline adding `weight` of engagement now, plus any other `fields`."""
+        now = now or datetime.utcnow()
+        boost = weight * math.exp((now - self.epoch).total_seconds() * 1000 / TAU_MS)
+        fields["trend_score"] = {"$add": [rescaled(self.epoch), boost]}
+        fields["trend_epoch"] = {"$literal": self.epoch}
+        return [{"$set": fields}]
+
+    async def load_epoch(self):
+        doc = await meta_col.find_one_and_update(
+            {"_id": META_ID},
+            {"$setOnInsert": {"epoch": self.epoch}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.epoch = doc["epoch"]
+        return self.epoch
+
+    async def renormalize(self, force: bool = False):
+        """Move the epoch to now and rescale every score to it.
+
+        Only one worker wins the conditional epoch update; the others pick
+        the new epoch up on their next refresh. Returns the posts rescaled.
+        """
+        old = await self.load_epoch()
+        now = to_ms(datetime.utcnow())
+        if not force and (now - old).total_seconds() < RENORMALIZE_INTERVAL:
+            return 0
+        won = await meta_col.find_one_and_update(
+            {"_id": META_ID, "epoch": old}, {"$set": {"epoch": now, "renormalized_at": now}}
+        )
+        if not won:
+            await self.load_epoch()
+            return 0
+        self.epoch = now
+
+        started = datetime.utcnow()
+        res = await posts_col.update_many(
+            {"trend_score": {"$exists": True}, "trend_epoch": {"$ne": now}},
+            [{"$set": {"trend_score": rescaled(now), "trend_epoch": {"$literal": now}}}],
+        )
+        self.renormalized += res.modified_count
+        self.last_renormalize_ms = (datetime.utcnow() - started).total_seconds() * 1000
+        return res.modified_count
+
+    async def settle(self) -> int:
+        """Rescale scores that workers still on the previous epoch wrote after a renormalize.
+
+        Workers only pick up a new epoch every EPOCH_REFRESH seconds, and the
+        feed sorts on raw trend_score, so their writes would otherwise stay
+        inflated until the next renormalize. Only runs while the epoch is
+        young enough for such writes to still be arriving.
+        """
+        now = datetime.utcnow()
+        if (now - self.epoch).total_seconds() > 3 * EPOCH_REFRESH:
+            return 0
+        res = await posts_col.update_many(
+            {"trend_epoch": {"$lt": self.epoch}},
+            [{"$set": {"trend_score": rescaled(self.epoch), "trend_epoch": {"$literal": self.epoch}}}],
+        )
+        self.settled += res.modified_count
+        return res.modified_count
+
+    async def backfill(self):
+        """Seed trend_score for posts that never had one, from their lifetime counters.
+
+        All of a post's engagement is treated as if it happened at creation.
+        """
+        await self.load_epoch()
+        reactions = {"$sum": {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$reactions", {}]}},
+            "in": "$$this.v",
+        }}}
+        weight = {"$add": [
+            {"$multiply": [{"$ifNull": ["$views", 0]}, VIEW_WEIGHT]},
+            {"$multiply": [reactions, REACTION_WEIGHT]},
+            {"$multiply": [{"$ifNull": ["$comment_count", 0]}, COMMENT_WEIGHT]},
+        ]}
+        age = {"$subtract": ["$created_at", self.epoch]}
+        res = await posts_col.update_many(
+            {"trend_score": {"$exists": False}},
+            [{"$set": {
+                "trend_score": {"$multiply": [weight, {"$exp": {"$divide": [age, TAU_MS]}}]},
+                "trend_epoch": {"$literal": self.epoch},
+            }}],
+        )
+        return res.modified_count
+
+    async def _run(self):
+        while True:
+            try:
+                await self.renormalize()
+                await self.settle()
+            except Exception as e:
+                print("Warning: trending renormalize failed:", e)
+            await asyncio.sleep(EPOCH_REFRESH)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "epoch": self.epoch,
+            "half_life_hours": HALF_LIFE_HOURS,
+            "renormalized": self.renormalized,
+            "settled": self.settled,
+            "last_renormalize_ms": round(self.last_renormalize_ms, 3),
+        }
+
+
+trending = Trending()
@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+from backend.summary import summarize
+
+EDITABLE_FIELDS = ("content", "media_url", "category_id", "status", "tags")
+
+
+def utcnow_ms() -> datetime:
+    """utcnow truncated to the millisecond precision Mongo stores."""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def edit_tags(tags, push=None, pull=None) -> list:
+    tags = list(tags or [])
+    if push is not None and push not in tags:
+        tags.append(push)
+    if pull is not None:
+        tags = [t for t in tags if t != pull]
+    return tags
+
+
+def plan_post_update(p: dict, now: datetime) -> dict:
+    """Normalize a PostUpdate payload into the edits it actually makes.
+
+    push_tag is applied before pull_tag, as separate requests would; with a
+    full `tags` replacement both are folded into the new list.
+    """
+    set_ = {f: p[f] for f in EDITABLE_FIELDS if f in p}
+    push, pull = p.get("push_tag"), p.get("pull_tag")
+    if "tags" in set_:
+        set_["tags"] = edit_tags(set_["tags"], push, pull)
+        push = pull = None
+    elif push is not None and push == pull:
+        push = None
+
+    if "content" in set_:
+        set_.update(summarize(set_["content"]))
+    if set_ or push is not None or pull is not None:
+        set_["updated_at"] = now
+    return {"set": set_, "push": push, "pull": pull, "inc": p.get("inc_views") or 0}
+
+
+def compile_post_update(plan: dict):
+    """One update document (or pipeline) applying the whole plan atomically."""
+    set_, push, pull, inc = plan["set"], plan["push"], plan["pull"], plan["inc"]
+
+    if push is not None and pull is not None:
+        # $addToSet and $pull can't both target `tags` in one update, so
+        # express the whole edit as a pipeline $set instead
+        tags = {"$ifNull": ["$tags", []]}
+        stage = {k: {"$literal": v} for k, v in set_.items()}
+        stage["tags"] = {
+            "$concatArrays": [
+                {"$filter": {"input": tags, "cond": {"$ne": ["$$this", {"$literal": pull}]}}},
+                {"$cond": [{"$in": [{"$literal": push}, tags]}, [], {"$literal": [push]}]},
+            ]
+        }
+        if inc:
+            stage["views"] = {"$add": [{"$ifNull": ["$views", 0]}, inc]}
+        return [{"$set": stage}]
+
+    update = {}
+    if set_:
+        update["$set"] = set_
+    if inc:
+        update["$inc"] = {"views": inc}
+    if push is not None:
+        update["$addToSet"] = {"tags": push}
+    if pull is not None:
+        update["$pull"] = {"tags": pull}
+    return update
+
+
+def apply_post_update(doc: dict, plan: dict) -> dict:
+    """The document `compile_post_update(plan)` turns `doc` into."""
+    after = dict(doc)
+    after.update(plan["set"])
+    # a lone $pull leaves a missing `tags` missing; anything else creates it
+    if plan["push"] is not None or (plan["pull"] is not None and "tags" in after):
+        after["tags"] = edit_tags(after.get("tags"), plan["push"], plan["pull"])
+    if plan["inc"]:
+        after["views"] = after.get("views", 0) + plan["inc"]
+    return after
+
+
+def version_filter(if_match: str) -> dict:
+    """Query clause matching a post whose version is the given If-Match value.
+
+    A post's version is its `updated_at`, or `created_at` if it was never
+    edited, as an ISO timestamp, or the post's ETag. `*` matches any
+    existing post.
+    """
+    value = if_match.strip()
+    if value == "*":
+        return {}
+    if value.startswith("W/"):
+        value = value[2:]
+    # a post ETag is "<version>~<counters>"; only the version matters here
+    value = value.strip('"').split("~", 1)[0]
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+    return {"$or": [{"updated_at": ts}, {"updated_at": None, "created_at": ts}]}
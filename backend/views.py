@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+from backend.db import posts_col
+from backend.trending import VIEW_WEIGHT, increment, trending
+
+FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "2"))
+FLUSH_THRESHOLD = int(os.getenv("VIEW_FLUSH_THRESHOLD", "500"))
+
+
+class ViewBuffer:
+    """Write-behind view counter.
+
+    Hits are merged per post in memory and written as one unordered
+    bulk_write of view (and trend score) increments, either every `interval` seconds or as soon as
+    `threshold` distinct posts are pending.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, threshold: int = FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.pending = {}
+        self._lock = asyncio.Lock()
+        self._task = None
+        # the flush a full buffer scheduled; at most one outstanding at a time
+        self._early = None
+        self.hits = 0
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def hit(self, post_id: ObjectId, n: int = 1):
+        self.pending[post_id] = self.pending.get(post_id, 0) + n
+        self.hits += n
+        if len(self.pending) >= self.threshold and (self._early is None or self._early.done()):
+            self._early = asyncio.get_running_loop().create_task(self.flush())
+            self._early.add_done_callback(self._early_done)
+
+    def _early_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print("Warning: view flush failed:", task.exception())
+
+    async def flush(self):
+        async with self._lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+
+            now = datetime.utcnow()
+            ops = [
+                UpdateOne({"_id": _id}, trending.stage(VIEW_WEIGHT * n, now, views=increment("views", n)))
+                for _id, n in batch.items()
+            ]
+            started = time.perf_counter()
+            try:
+                await posts_col.bulk_write(ops, ordered=False)
+            except Exception:
+                # put the counts back so the next tick retries them
+                for _id, n in batch.items():
+                    self.pending[_id] = self.pending.get(_id, 0) + n
+                self.failed_flushes += 1
+                raise
+            finally:
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+            self.flushes += 1
+            self.flushed_ops += len(ops)
+            self.total_flush_ms += self.last_flush_ms
+            return len(ops)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print("Warning: view flush failed:", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self):
+        return {
+            "pending_posts": len(self.pending),
+            "pending_views": sum(self.pending.values()),
+            "hits": self.hits,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+        }
+
+
+view_buffer = ViewBuffer()
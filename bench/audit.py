@@ -0,0 +1,91 @@
+"""Drive every benchmark route against a seeded mongod and fail on collection scans.
+
+    MONGO_TLS=0 python -m bench.audit [--posts 500] [--allow "GET /posts/search"] [--fail-on-sort]
+
+Runs the app in-process with QUERY_AUDIT=1 and a sample rate of 1, so every
+query shape each route sends is explained once. Prints the per-route report
+and exits 1 when a route's query plan contains a COLLSCAN (or, with
+--fail-on-sort, an in-memory sort) that isn't allowed with --allow.
+Needs a real mongod: the in-process stand-in can't explain.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+
+async def run(args):
+    os.environ["QUERY_AUDIT"] = "1"
+    os.environ["QUERY_AUDIT_SAMPLE"] = "1"
+
+    from bench.load import bind_database, build_plan, drive
+    from bench.seed import seed
+
+    args.standin = False
+    dbm = bind_database(args)
+    if "bench" not in dbm.DB_NAME:
+        sys.exit(f"refusing to drop database {dbm.DB_NAME!r}: use a --db name containing 'bench'")
+
+    import httpx
+    from backend.audit import query_audit
+    from backend.indexes import create_indexes
+    from backend.main import app
+
+    # before the client exists, so the listener is attached to it
+    query_audit.start()
+    await dbm.get_client().drop_database(dbm.DB_NAME)
+    await create_indexes()
+    corpus = await seed(dbm.get_db(), posts=args.posts, seed=args.seed)
+    rnd = random.Random(args.seed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://audit") as client:
+        res = await client.post("/api/register", params={"username": "audit", "email": "audit@example.com"})
+        headers = {"Authorization": f"Bearer {res.json()['token']}"}
+        plan = build_plan(corpus, headers, rnd, standin=False)
+        plan.append(("text_filter_feed", 1, lambda: ("GET", "/api/posts", {"params": {"q": "nebula"}})))
+        # equal weights and a few rounds, so every scenario shows up
+        plan = [(name, 1, make) for name, _, make in plan]
+        await drive(client, plan, len(plan) * args.rounds, 1, rnd, record=False)
+
+    await query_audit.drain()
+    await query_audit.stop()
+    return query_audit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.audit")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--db", default="cosmic_bench_audit")
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5, help="requests per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--allow", action="append", default=[], metavar="ROUTE",
+                        help='route allowed to scan or sort in memory, e.g. "GET /posts/search"')
+    parser.add_argument("--fail-on-sort", action="store_true", help="also fail on in-memory sorts")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    audit = asyncio.run(run(args))
+    report = audit.report()
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True, default=str))
+    else:
+        for route in sorted(report):
+            for e in report[route]:
+                flags = [f for f, on in (("COLLSCAN", e.get("collscan")), ("SORT", e.get("in_memory_sort"))) if on]
+                print(
+                    f"{route:40} {e['collection']:12} plan={'>'.join(e.get('plan') or []) or '-':32} "
+                    f"examined={e.get('docs_examined')} returned={e.get('returned')} {' '.join(flags)}"
+                )
+
+    problems = [p for p in audit.problems(include_sorts=args.fail_on_sort) if p[0] not in args.allow]
+    for route, collection, what in problems:
+        print(f"FAIL: {route} does a {what} on {collection}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Seed a corpus, drive the real API routes concurrently, report JSON.
+
+    python -m bench.load --posts 2000 --requests 5000 --concurrency 32 --out run.json
+    python -m bench.load --standin --out run.json      # in-process mongomock-motor
+    python -m bench.load --compare base.json run.json [--tolerance 0.15]
+
+Against a real server this uses MONGO_URI (default localhost:27017, no TLS)
+and drops/reseeds the --db database, which must have "bench" in its name.
+Requests go through an in-process ASGI client, so numbers measure the app and
+Mongo, not the network stack. Runs with the same config are comparable.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from itertools import accumulate
+
+from pymongo import monitoring
+
+from bench.seed import seed, zipf_weights
+
+_request_ops = contextvars.ContextVar("bench_request_ops", default=None)
+
+
+class OpCounter(monitoring.CommandListener):
+    """Counts Mongo commands issued on behalf of the current bench request.
+
+    Motor copies the caller's context into its executor threads, so the
+    counter set by the request task is visible here.
+    """
+
+    def started(self, event):
+        ops = _request_ops.get()
+        if ops is not None:
+            ops[0] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def bind_database(args):
+    """Point backend.db at the bench database; must run before the client is created."""
+    os.environ["MONGO_DB"] = args.db
+    os.environ.setdefault("MONGO_TLS", "0")
+    # one client driving thousands of requests would just measure the rate limiter
+    os.environ.setdefault("ADMISSION_ENABLED", "0")
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    monitoring.register(OpCounter())
+
+    import backend.db as dbm
+
+    if args.standin:
+        from mongomock_motor import AsyncMongoMockClient
+
+        dbm.bind_client(AsyncMongoMockClient())
+    return dbm
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+
+def build_plan(corpus, headers, rnd, standin: bool):
+    """(name, weight, request factory) for each scenario in the mix."""
+    ids = corpus["post_ids"]
+    hot = list(accumulate(zipf_weights(len(ids), 1.0)))
+    tags = list(corpus["tag_weights"])
+    tag_cum = list(accumulate(corpus["tag_weights"][t] for t in tags))
+    authors = corpus["authors"]
+
+    def post_id():
+        return rnd.choices(ids, cum_weights=hot)[0]
+
+    def tag():
+        return rnd.choices(tags, cum_weights=tag_cum)[0]
+
+    plan = [
+        ("list_posts", 15, lambda: ("GET", "/api/posts", {"params": {"limit": 20}})),
+        ("list_posts_summary", 10, lambda: ("GET", "/api/posts", {"params": {"limit": 20, "view": "summary"}})),
+        ("list_posts_tag", 10, lambda: ("GET", "/api/posts", {"params": {"limit": 20, "tag": tag()}})),
+        ("list_posts_author", 5, lambda: ("GET", "/api/posts", {"params": {"limit": 20, "author": rnd.choice(authors)}})),
+        ("get_post", 25, lambda: ("GET", f"/api/posts/{post_id()}", {})),
+        ("post_full", 10, lambda: ("GET", f"/api/posts/{post_id()}/full", {})),
+        ("comments", 8, lambda: ("GET", f"/api/posts/{post_id()}/comments", {})),
+        ("reactions", 5, lambda: ("GET", f"/api/posts/{post_id()}/reactions", {})),
+        ("top_tags", 4, lambda: ("GET", "/api/posts/analytics/top-tags", {"params": {"limit": 10}})),
+        ("update_post", 3, lambda: (
+            "PUT", f"/api/posts/{post_id()}",
+            {"json": {"content": f"Edited {rnd.random()}\n\nbody"}, "headers": headers},
+        )),
+    ]
+    if not standin:
+        # mongomock has no $text support
+        plan.append(("search", 5, lambda: ("GET", "/api/posts/search", {"params": {"q": rnd.choice(("nebula", "comet orbit", "photon"))}})))
+    return plan
+
+
+async def drive(client, plan, total: int, concurrency: int, rnd, record: bool = True):
+    names = [p[0] for p in plan]
+    cum = list(accumulate(p[1] for p in plan))
+    makers = {p[0]: p[2] for p in plan}
+    latencies = {name: [] for name in names}
+    ops = {name: [] for name in names}
+    errors = Counter()
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            name = rnd.choices(names, cum_weights=cum)[0]
+            method, url, kwargs = makers[name]()
+            counter = [0]
+            token = _request_ops.set(counter)
+            started = time.perf_counter()
+            try:
+                res = await client.request(method, url, **kwargs)
+                ok = res.status_code < 400
+            except Exception:
+                ok = False
+            finally:
+                elapsed = time.perf_counter() - started
+                _request_ops.reset(token)
+            if record:
+                latencies[name].append(elapsed * 1000)
+                ops[name].append(counter[0])
+                if not ok:
+                    errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, ops, errors
+
+
+def summarize_run(elapsed, latencies, ops, errors, count_ops: bool):
+    routes = {}
+    for name, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        routes[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "throughput_rps": round(len(values) / elapsed, 1),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "mongo_ops_per_request": round(sum(ops[name]) / len(values), 3) if count_ops else None,
+        }
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "totals": {
+            "requests": total,
+            "errors": sum(errors.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        },
+        "routes": routes,
+    }
+
+
+async def run(args):
+    dbm = bind_database(args)
+    import httpx
+    from backend.main import app
+
+    if not args.standin:
+        if "bench" not in dbm.DB_NAME:
+            sys.exit(f"refusing to drop database {dbm.DB_NAME!r}: use a --db name containing 'bench'")
+        await dbm.get_client().drop_database(dbm.DB_NAME)
+        from backend.indexes import create_indexes
+
+        await create_indexes()
+
+    corpus = await seed(
+        dbm.get_db(),
+        posts=args.posts,
+        tags=args.tags,
+        authors=args.authors,
+        comments_per_post=args.comments,
+        reactions_per_post=args.reactions,
+        zipf_s=args.zipf,
+        seed=args.seed,
+    )
+    rnd = random.Random(args.seed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        res = await client.post("/api/register", params={"username": "bench", "email": "bench@example.com"})
+        headers = {"Authorization": f"Bearer {res.json()['token']}"}
+        plan = build_plan(corpus, headers, rnd, args.standin)
+
+        if args.warmup:
+            await drive(client, plan, args.warmup, args.concurrency, rnd, record=False)
+        elapsed, latencies, ops, errors = await drive(client, plan, args.requests, args.concurrency, rnd)
+
+    report = summarize_run(elapsed, latencies, ops, errors, count_ops=not args.standin)
+    report["config"] = {
+        "backend": "standin" if args.standin else "mongo",
+        "posts": args.posts,
+        "tags": args.tags,
+        "authors": args.authors,
+        "comments_per_post": args.comments,
+        "reactions_per_post": args.reactions,
+        "zipf_s": args.zipf,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+    }
+    report["env"] = {"python": platform.python_version(), "machine": platform.machine()}
+    return report
+
+
+def compare(base: dict, new: dict, tolerance: float):
+    """Print per-route deltas; return the list of regressions found."""
+    if base.get("config") != new.get("config"):
+        print("warning: runs used different configs, deltas may not mean much")
+
+    regressions = []
+    for name in sorted(set(base["routes"]) | set(new["routes"])):
+        b, n = base["routes"].get(name), new["routes"].get(name)
+        if not b or not n:
+            print(f"{name:22} only in {'new' if n else 'base'} run")
+            continue
+
+        cells = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = n[metric] / b[metric] - 1 if b[metric] else 0.0
+            cells.append(f"{metric}={n[metric]:.2f} ({change:+.0%})")
+            if change > tolerance:
+                regressions.append(f"{name} {metric} {b[metric]:.2f} -> {n[metric]:.2f}")
+
+        change = n["throughput_rps"] / b["throughput_rps"] - 1 if b["throughput_rps"] else 0.0
+        cells.append(f"rps={n['throughput_rps']} ({change:+.0%})")
+        if change < -tolerance:
+            regressions.append(f"{name} throughput {b['throughput_rps']} -> {n['throughput_rps']}")
+
+        # op counts are deterministic, so any increase is a real change
+        if b.get("mongo_ops_per_request") is not None and n.get("mongo_ops_per_request") is not None:
+            cells.append(f"ops={n['mongo_ops_per_request']}")
+            if n["mongo_ops_per_request"] > b["mongo_ops_per_request"] + 0.05:
+                regressions.append(
+                    f"{name} mongo ops/request {b['mongo_ops_per_request']} -> {n['mongo_ops_per_request']}"
+                )
+        print(f"{name:22} " + "  ".join(cells))
+
+    for line in regressions:
+        print("REGRESSION:", line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.load")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two report files and exit")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown for --compare")
+    parser.add_argument("--standin", action="store_true", help="use in-process mongomock-motor instead of mongod")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--db", default="cosmic_bench")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=5, help="average comments per post")
+    parser.add_argument("--reactions", type=int, default=8, help="average reactions per post")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for tag popularity")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(base, new, args.tolerance) else 0)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Seed a synthetic corpus shaped like the data the API writes.
+
+Tags follow a Zipf distribution so a few tags dominate, as on the real site.
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from backend.summary import summarize
+
+REACTION_TYPES = ("like", "love", "dislike")
+WORDS = (
+    "nebula star orbit comet galaxy quasar pulsar planet moon rocket launch "
+    "cosmos gravity photon dust telescope signal horizon eclipse meteor"
+).split()
+
+
+def zipf_weights(n: int, s: float):
+    return [1 / (k ** s) for k in range(1, n + 1)]
+
+
+def make_corpus(
+    posts: int = 2000,
+    tags: int = 50,
+    authors: int = 100,
+    comments_per_post: int = 5,
+    reactions_per_post: int = 8,
+    zipf_s: float = 1.1,
+    seed: int = 42,
+):
+    """Return (posts, comments, reactions, tag_counts) document lists."""
+    rnd = random.Random(seed)
+    tag_names = [f"tag{i}" for i in range(tags)]
+    weights = zipf_weights(tags, zipf_s)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    post_docs, comment_docs, reaction_docs = [], [], []
+    tag_counts = Counter()
+
+    for i in range(posts):
+        _id = ObjectId()
+        created = now - timedelta(seconds=rnd.randint(0, 90 * 24 * 3600))
+        post_tags = sorted(set(rnd.choices(tag_names, weights=weights, k=rnd.randint(1, 4))))
+        tag_counts.update(post_tags)
+        body = " ".join(rnd.choices(WORDS, k=rnd.randint(40, 400)))
+        content = f"Post {i} about {rnd.choice(WORDS)}\n\n{body}"
+
+        n_reactions = rnd.randint(0, 2 * reactions_per_post)
+        reactions = Counter(rnd.choices(REACTION_TYPES, weights=(6, 3, 1), k=n_reactions))
+        for k, rtype in enumerate(reactions.elements()):
+            reaction_docs.append({
+                "post_id": str(_id),
+                "user_id": f"user{k}",
+                "reaction_type": rtype,
+                "created_at": created,
+            })
+
+        n_comments = rnd.randint(0, 2 * comments_per_post)
+        for k in range(n_comments):
+            comment_docs.append({
+                "post_id": str(_id),
+                "user_id": f"author{rnd.randrange(authors)}",
+                "content": " ".join(rnd.choices(WORDS, k=rnd.randint(3, 30))),
+                "created_at": created + timedelta(minutes=k + 1),
+            })
+
+        post_docs.append({
+            "_id": _id,
+            "author_id": f"author{rnd.randrange(authors)}",
+            "content": content,
+            "media_url": "",
+            "category_id": "general",
+            "status": "published",
+            "tags": post_tags,
+            "views": rnd.randint(0, 5000),
+            "reactions": dict(reactions),
+            "comment_count": n_comments,
+            **summarize(content),
+            "created_at": created,
+            "updated_at": None,
+        })
+
+    tag_docs = [{"_id": tag, "count": n} for tag, n in tag_counts.items()]
+    return post_docs, comment_docs, reaction_docs, tag_docs
+
+
+async def seed(db, batch_size: int = 1000, **corpus_options):
+    """Insert a corpus into `db` (posts, comments, reactions, tag_counts)."""
+    posts, comments, reactions, tag_counts = make_corpus(**corpus_options)
+    for name, docs in (
+        ("posts", posts),
+        ("comments", comments),
+        ("reactions", reactions),
+        ("tag_counts", tag_counts),
+    ):
+        for i in range(0, len(docs), batch_size):
+            await db[name].insert_many(docs[i:i + batch_size], ordered=False)
+    return {
+        "posts": len(posts),
+        "comments": len(comments),
+        "reactions": len(reactions),
+        "tags": len(tag_counts),
+        "post_ids": [str(p["_id"]) for p in posts],
+        "authors": sorted({p["author_id"] for p in posts}),
+        "tag_weights": Counter({t["_id"]: t["count"] for t in tag_counts}),
+    }
@@ -0,0 +1,97 @@
+"""Compare the default and fast JSON paths for post list responses.
+
+    python -m bench.serialization [--pages 20 100] [--repeat 200] [--json]
+
+The default path mirrors what FastAPI does for response_model=List[PostOut]:
+validate every item against the model, run jsonable_encoder, then json.dumps.
+The fast path encodes the to_out dicts straight to bytes.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from backend.encoding import dumps, stdlib_dumps, orjson
+from backend.routes.posts import to_out
+from backend.schemas import PostOut
+
+
+def make_docs(n: int, body_words: int = 120):
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "author_id": f"user{i % 17}",
+            "content": f"Post {i}\n\n" + " ".join(["lorem"] * body_words),
+            "media_url": "",
+            "category_id": "general",
+            "status": "published",
+            "tags": ["space", f"tag{i % 7}"],
+            "views": i * 3,
+            "reactions": {"like": i % 5, "love": i % 3},
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": None,
+        }
+        for i in range(n)
+    ]
+
+
+def default_path(docs):
+    items = [PostOut(**to_out(d)) for d in docs]
+    return json.dumps(jsonable_encoder(items)).encode()
+
+
+def fast_path(docs):
+    return dumps([to_out(d) for d in docs])
+
+
+def fast_path_stdlib(docs):
+    return stdlib_dumps([to_out(d) for d in docs])
+
+
+def timeit(fn, docs, repeat: int) -> float:
+    fn(docs)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(docs)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def run(pages, repeat):
+    paths = {"default": default_path, "fast_stdlib": fast_path_stdlib}
+    if orjson is not None:
+        paths["fast_orjson"] = fast_path
+
+    results = []
+    for n in pages:
+        docs = make_docs(n)
+        row = {"items": n}
+        for name, fn in paths.items():
+            row[f"{name}_us"] = round(timeit(fn, docs, repeat), 1)
+        for name in paths:
+            if name != "default":
+                row[f"{name}_speedup"] = round(row["default_us"] / row[f"{name}_us"], 2)
+        results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.pages, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print("  ".join(f"{k}={v}" for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    main()
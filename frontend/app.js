@@ -65,7 +65,7 @@ function authHeaders() {
   return t ? { Authorization: `Bearer ${t}` } : {};
 }
 
-async function apiFetch(path, opts = {}) {
+async function apiResponse(path, opts = {}) {
   const res = await fetch(`${API_BASE}${path}`, opts);
 
   if (!res.ok) {
@@ -79,12 +79,25 @@ async function apiFetch(path, opts = {}) {
     }
     throw new Error(msg);
   }
+  return res;
+}
+
+async function apiFetch(path, opts = {}) {
+  const res = await apiResponse(path, opts);
 
   const ct = res.headers.get("content-type") || "";
   if (ct.includes("application/json")) return await res.json();
   return null;
 }
 
+async function apiFetchPage(path, opts = {}) {
+  const res = await apiResponse(path, opts);
+  return {
+    items: await res.json(),
+    next: res.headers.get("X-Next-Cursor") || "",
+  };
+}
+
 const PAGES = {
   home: "#pageHome",
   my: "#pageMy",
@@ -143,7 +156,7 @@ function postCard(p, allowEdit = true) {
   el.className = "post-card";
 
   const title = escapeHtml(p.title || extractTitleFromContent(p.content));
-  const body = escapeHtml(excerpt(p.content));
+  const body = escapeHtml(p.excerpt ?? excerpt(p.content));
   const thumb = p.media_url
     ? `<div class="thumb" style="background-image:url('${escapeHtml(p.media_url)}')"></div>`
     : "";
@@ -152,6 +165,7 @@ function postCard(p, allowEdit = true) {
     ${thumb}
     <h3 class="title">${title}</h3>
     <div class="excerpt">${body}</div>
+    <div class="muted" style="margin-top:6px">💬 ${Number(p.comment_count ?? 0)}</div>
     <div style="margin-top:10px;display:flex;gap:8px;flex-wrap:wrap">
       <button class="btn btn-ghost view-btn">Open</button>
       ${
@@ -169,7 +183,14 @@ function postCard(p, allowEdit = true) {
     openPostById(p.id, true);
   });
 
-  el.querySelector(".edit-btn")?.addEventListener("click", () => openEditModal(p));
+  el.querySelector(".edit-btn")?.addEventListener("click", async () => {
+    // feed cards are summaries without the body, so fetch the full post
+    try {
+      openEditModal(await apiFetch(`/posts/${p.id}`));
+    } catch (e) {
+      showNotification("Edit open failed: " + e.message, true);
+    }
+  });
   el.querySelector(".delete-btn")?.addEventListener("click", () => deletePost(p.id));
 
   return el;
@@ -200,6 +221,7 @@ function closeModal(sel) {
 }
 
 let editingPostId = null;
+let editingVersion = "";
 
 function openCreateModal() {
   editingPostId = null;
@@ -214,6 +236,7 @@ function openCreateModal() {
 
 function openEditModal(p) {
   editingPostId = p.id;
+  editingVersion = p.updated_at || p.created_at || "";
   const form = $("#createForm");
   if (!form) return;
 
@@ -232,9 +255,9 @@ function openEditModal(p) {
 }
 
 const state = {
-  home: { skip: 0, limit: 20, tag: "" },
-  my: { skip: 0, limit: 20 },
-  search: { skip: 0, limit: 20, q: "", tag: "" },
+  home: { cursor: "", done: false, limit: 20, tag: "" },
+  my: { cursor: "", done: false, limit: 20 },
+  search: { cursor: "", done: false, limit: 20, q: "", tag: "" },
 };
 
 function buildQuery(params) {
@@ -250,21 +273,24 @@ function buildQuery(params) {
 
 async function loadHome(reset = false) {
   const tag = ($("#homeTag")?.value || "").trim();
-  if (reset) state.home.skip = 0;
+  if (reset) Object.assign(state.home, { cursor: "", done: false });
+  else if (state.home.done) return showNotification("No more posts 🙃");
   state.home.tag = tag;
 
   const qs = buildQuery({
     limit: state.home.limit,
-    skip: state.home.skip,
+    cursor: state.home.cursor,
     tag: state.home.tag,
+    view: "summary",
   });
 
   try {
-    const data = await apiFetch(`/posts?${qs}`);
-    if (reset) renderPosts("#homePosts", data, true);
-    else appendPosts("#homePosts", data, true);
+    const { items, next } = await apiFetchPage(`/posts?${qs}`);
+    if (reset) renderPosts("#homePosts", items, true);
+    else appendPosts("#homePosts", items, true);
 
-    state.home.skip += data.length;
+    state.home.cursor = next;
+    state.home.done = !next;
   } catch (e) {
     showNotification("Home load failed: " + e.message, true);
   }
@@ -277,23 +303,26 @@ async function loadMy(reset = false) {
     return;
   }
 
-  if (reset) state.my.skip = 0;
+  if (reset) Object.assign(state.my, { cursor: "", done: false });
+  else if (state.my.done) return showNotification("No more posts 🙃");
 
   const qs = buildQuery({
     limit: state.my.limit,
-    skip: state.my.skip,
+    cursor: state.my.cursor,
+    view: "summary",
   });
 
   try {
-    const data = await apiFetch(`/posts/me?${qs}`, {
+    const { items, next } = await apiFetchPage(`/posts/me?${qs}`, {
       method: "GET",
       headers: { ...authHeaders() },
     });
 
-    if (reset) renderPosts("#myPosts", data, true);
-    else appendPosts("#myPosts", data, true);
+    if (reset) renderPosts("#myPosts", items, true);
+    else appendPosts("#myPosts", items, true);
 
-    state.my.skip += data.length;
+    state.my.cursor = next;
+    state.my.done = !next;
   } catch (e) {
     showNotification("My posts failed: " + e.message, true);
   }
@@ -303,23 +332,28 @@ async function loadSearch(reset = false) {
   const q = ($("#searchQuery")?.value || "").trim();
   const tag = ($("#searchTag")?.value || "").trim();
 
-  if (reset) state.search.skip = 0;
+  if (reset) Object.assign(state.search, { cursor: "", done: false });
+  else if (state.search.done) return showNotification("No more posts 🙃");
   state.search.q = q;
   state.search.tag = tag;
 
   const qs = buildQuery({
     limit: state.search.limit,
-    skip: state.search.skip,
+    cursor: state.search.cursor,
     q: state.search.q,
     tag: state.search.tag,
+    view: q ? "" : "summary",
   });
 
   try {
-    const data = await apiFetch(`/posts?${qs}`);
-    if (reset) renderPosts("#searchPosts", data, true);
-    else appendPosts("#searchPosts", data, true);
-
-    state.search.skip += data.length;
+    // ranked search needs keywords; a tag on its own is just a filtered feed
+    const path = q ? "/posts/search" : "/posts";
+    const { items, next } = await apiFetchPage(`${path}?${qs}`);
+    if (reset) renderPosts("#searchPosts", items, true);
+    else appendPosts("#searchPosts", items, true);
+
+    state.search.cursor = next;
+    state.search.done = !next;
   } catch (e) {
     showNotification("Search failed: " + e.message, true);
   }
@@ -358,49 +392,42 @@ async function openPostById(id, incView = false) {
   currentPostId = id;
 
   try {
-    if (incView) {
-      try {
-        await apiFetch(`/posts/${id}`, {
-          method: "PUT",
-          headers: { "Content-Type": "application/json", ...authHeaders() },
-          body: JSON.stringify({ inc_views: 1 }),
-        });
-      } catch {
-      }
-    }
-
-    const p = await apiFetch(`/posts/${id}`);
-    fillPostView(p);
-
-    await loadComments(id);
-    await loadReactions(id);
+    const qs = incView ? "?view=1" : "";
+    const data = await apiFetch(`/posts/${id}/full${qs}`);
+    fillPostView(data.post);
+    renderComments(data.comments);
+    renderReactions(data.reactions);
   } catch (e) {
     showNotification("Open post failed: " + e.message, true);
     $("#postView").style.display = "none";
   }
 }
 
-async function loadComments(postId) {
+function renderComments(data) {
   const list = $("#commentsList");
   if (!list) return;
 
-  try {
-    const data = await apiFetch(`/posts/${postId}/comments`);
+  if (!Array.isArray(data) || data.length === 0) {
+    list.innerHTML = `<li class="muted">No comments yet.</li>`;
+    return;
+  }
 
-    if (!Array.isArray(data) || data.length === 0) {
-      list.innerHTML = `<li class="muted">No comments yet.</li>`;
-      return;
-    }
+  list.innerHTML = data
+    .filter(c => c && typeof c === "object")
+    .map(c => {
+      const who = escapeHtml(c.user_id ?? "user");
+      const text = escapeHtml(c.content ?? "");
+      return `<li><b>${who}:</b> ${text}</li>`;
+    })
+    .join("");
+}
 
-    list.innerHTML = data
-      .filter(c => c && typeof c === "object")
-      .map(c => {
-        const who = escapeHtml(c.user_id ?? "user");
-        const text = escapeHtml(c.content ?? "");
-        return `<li><b>${who}:</b> ${text}</li>`;
-      })
-      .join("");
+async function loadComments(postId) {
+  const list = $("#commentsList");
+  if (!list) return;
 
+  try {
+    renderComments(await apiFetch(`/posts/${postId}/comments`));
   } catch (e) {
     console.error("loadComments error:", e);
     list.innerHTML = `<li class="muted">Failed to load comments.</li>`;
@@ -491,9 +518,10 @@ async function submitPost(e) {
 
   try {
     if (editingPostId) {
+      const ifMatch = editingVersion ? { "If-Match": editingVersion } : {};
       await apiFetch(`/posts/${editingPostId}`, {
         method: "PUT",
-        headers: { "Content-Type": "application/json", ...authHeaders() },
+        headers: { "Content-Type": "application/json", ...ifMatch, ...authHeaders() },
         body: JSON.stringify(payload),
       });
       showNotification("Updated ✅");
@@ -688,25 +716,31 @@ document.addEventListener("DOMContentLoaded", async () => {
   showPage("home");
 });
 
-async function loadReactions(postId) {
+function renderReactions(data) {
   const list = document.getElementById("reactionList");
   const status = document.getElementById("reactionStatus");
   if (!list) return;
 
-  try {
-    const data = await apiFetch(`/posts/${postId}/reactions`);
-    if (!Array.isArray(data) || data.length === 0) {
-      list.innerHTML = `<li class="muted">No reactions yet.</li>`;
-      status.textContent = "—";
-      return;
-    }
+  if (!Array.isArray(data) || data.length === 0) {
+    list.innerHTML = `<li class="muted">No reactions yet.</li>`;
+    status.textContent = "—";
+    return;
+  }
 
-    list.innerHTML = data
-      .map(r => `<li>${r.reaction} — <b>${r.count}</b></li>`)
-      .join("");
+  list.innerHTML = data
+    .map(r => `<li>${r.reaction} — <b>${r.count}</b></li>`)
+    .join("");
+
+  const total = data.reduce((s, r) => s + r.count, 0);
+  status.textContent = `total: ${total}`;
+}
 
-    const total = data.reduce((s, r) => s + r.count, 0);
-    status.textContent = `total: ${total}`;
+async function loadReactions(postId) {
+  const list = document.getElementById("reactionList");
+  if (!list) return;
+
+  try {
+    renderReactions(await apiFetch(`/posts/${postId}/reactions`));
   } catch (e) {
     list.innerHTML = `<li class="muted">Failed to load reactions</li>`;
   }
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+
+from backend.pagination import after_cursor, decode_cursor, encode_cursor
+
+FEED_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def test_cursor_round_trip_truncates_to_ms():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1, 12, 0, 0, 123456)}
+    assert decode_cursor(encode_cursor(doc)) == (datetime(2024, 5, 1, 12, 0, 0, 123000), doc["_id"])
+
+
+def test_bad_cursor_is_a_400():
+    with pytest.raises(HTTPException) as e:
+        decode_cursor("not-a-cursor")
+    assert e.value.status_code == 400
+
+
+def test_after_cursor_pages_through_ties_exactly_once():
+    mongomock = pytest.importorskip("mongomock")
+    col = mongomock.MongoClient().db.posts
+    start = datetime(2024, 5, 1)
+    # groups of posts sharing a created_at, so the _id tiebreak matters
+    col.insert_many([{"_id": ObjectId(), "created_at": start + timedelta(seconds=i // 3)} for i in range(20)])
+    expected = [d["_id"] for d in col.find().sort(FEED_SORT)]
+
+    seen, cursor = [], None
+    while True:
+        query = after_cursor({}, cursor) if cursor else {}
+        page = list(col.find(query).sort(FEED_SORT).limit(4))
+        seen += [d["_id"] for d in page]
+        if len(page) < 4:
+            break
+        cursor = encode_cursor(page[-1])
+    assert seen == expected
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from backend.updates import apply_post_update, compile_post_update, plan_post_update, version_filter
+
+NOW = datetime(2024, 5, 1, 12, 0, 0, 123000)
+
+
+def post(**fields):
+    doc = {"_id": 1, "content": "old", "tags": ["a", "b"], "views": 2, "created_at": datetime(2024, 1, 1)}
+    doc.update(fields)
+    return doc
+
+
+def test_plan_push_and_pull():
+    plan = plan_post_update({"push_tag": "c", "pull_tag": "a"}, NOW)
+    assert plan == {"set": {"updated_at": NOW}, "push": "c", "pull": "a", "inc": 0}
+
+
+def test_plan_push_equal_to_pull_only_pulls():
+    # push then pull of the same tag leaves it removed
+    plan = plan_post_update({"push_tag": "a", "pull_tag": "a"}, NOW)
+    assert plan["push"] is None and plan["pull"] == "a"
+    assert apply_post_update(post(), plan)["tags"] == ["b"]
+
+
+def test_plan_folds_push_and_pull_into_tags():
+    plan = plan_post_update({"tags": ["x", "y"], "push_tag": "z", "pull_tag": "x"}, NOW)
+    assert plan["set"]["tags"] == ["y", "z"]
+    assert plan["push"] is None and plan["pull"] is None
+
+
+def test_plan_inc_only_is_not_an_edit():
+    plan = plan_post_update({"inc_views": 3}, NOW)
+    assert plan == {"set": {}, "push": None, "pull": None, "inc": 3}
+    assert compile_post_update(plan) == {"$inc": {"views": 3}}
+
+
+def test_plan_content_refreshes_summary():
+    plan = plan_post_update({"content": "Title line\n\nSome body text"}, NOW)
+    assert plan["set"]["updated_at"] == NOW
+    assert {"title", "excerpt", "word_count"} <= plan["set"].keys()
+
+
+def test_compile_empty_plan():
+    assert compile_post_update(plan_post_update({}, NOW)) == {}
+
+
+def test_compile_push_and_pull_is_a_pipeline():
+    update = compile_post_update(plan_post_update({"push_tag": "c", "pull_tag": "a", "inc_views": 1}, NOW))
+    assert isinstance(update, list) and list(update[0]) == ["$set"]
+    assert {"tags", "views", "updated_at"} <= update[0]["$set"].keys()
+
+
+def test_compile_push_only():
+    update = compile_post_update(plan_post_update({"push_tag": "c"}, NOW))
+    assert update == {"$set": {"updated_at": NOW}, "$addToSet": {"tags": "c"}}
+
+
+CASES = {
+    "push+pull": {"push_tag": "c", "pull_tag": "a"},
+    "push+pull existing": {"push_tag": "b", "pull_tag": "a", "inc_views": 4},
+    "push==pull": {"push_tag": "a", "pull_tag": "a"},
+    "tags+push/pull": {"tags": ["x", "a"], "push_tag": "y", "pull_tag": "a"},
+    "inc only": {"inc_views": 5},
+    "push only": {"push_tag": "a"},
+    "pull missing": {"pull_tag": "zzz"},
+    "content": {"content": "New text here", "status": "draft"},
+}
+
+
+@pytest.mark.parametrize("payload", CASES.values(), ids=list(CASES))
+@pytest.mark.parametrize("before", [post(), post(tags=None, views=None)], ids=["tagged", "bare"])
+def test_apply_matches_what_mongo_writes(payload, before):
+    mongomock = pytest.importorskip("mongomock")
+    before = {k: v for k, v in before.items() if v is not None}
+    col = mongomock.MongoClient().db.posts
+    col.insert_one(dict(before))
+
+    plan = plan_post_update(payload, NOW)
+    col.update_one({"_id": before["_id"]}, compile_post_update(plan))
+    assert col.find_one({"_id": before["_id"]}) == apply_post_update(before, plan)
+
+
+def test_version_filter_wildcard():
+    assert version_filter("*") == {}
+
+
+@pytest.mark.parametrize("value", [
+    "2024-05-01T12:00:00.123456",
+    '"2024-05-01T12:00:00.123~5~2~abcd"',
+    'W/"2024-05-01T12:00:00.123~5~2~abcd"',
+    "2024-05-01T14:00:00.123+02:00",
+    "2024-05-01T12:00:00.123Z",
+])
+def test_version_filter_accepts_timestamps_and_etags(value):
+    ts = datetime(2024, 5, 1, 12, 0, 0, 123000)
+    assert version_filter(value) == {"$or": [{"updated_at": ts}, {"updated_at": None, "created_at": ts}]}
+
+
+def test_version_filter_rejects_garbage():
+    with pytest.raises(HTTPException) as e:
+        version_filter("yesterday")
+    assert e.value.status_code == 400